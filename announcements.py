@@ -0,0 +1,326 @@
+import asyncio
+import hashlib
+import os
+import random
+import time
+from urllib.parse import urlparse
+
+from metrics import ANNOUNCEMENT_SECONDS, ANNOUNCEMENTS
+
+# --- Configuration ---
+ANNOUNCE_CONCURRENCY = int(os.getenv('ANNOUNCE_CONCURRENCY', '8'))    # Deliveries in flight at once
+ANNOUNCE_MAX_ATTEMPTS = int(os.getenv('ANNOUNCE_MAX_ATTEMPTS', '5'))  # Per delivery, per dispatch
+ANNOUNCE_RETRY_BASE = float(os.getenv('ANNOUNCE_RETRY_BASE', '1'))    # First retry delay in seconds; doubles each time
+ANNOUNCE_RETRY_MAX = 60.0
+
+# HTTP statuses a destination answers when it will never accept the announcement
+PERMANENT_STATUSES = (401, 403, 404)
+
+# Delivery statuses kept in the state store; only 'pending' ones are (re)sent
+DELIVERED, FAILED, PENDING = 'delivered', 'failed', 'pending'
+
+
+class RouteRateLimited(Exception):
+    """A destination answered 429. Every request on the route (or on all routes, if is_global) waits retry_after seconds."""
+
+    def __init__(self, retry_after, is_global=False):
+        super().__init__(f"rate limited for {retry_after:.1f}s{' (global)' if is_global else ''}")
+        self.retry_after = retry_after
+        self.is_global = is_global
+
+
+class DeliveryError(Exception):
+    """A delivery failed in a way worth retrying. permanent=True means it never will succeed."""
+
+    def __init__(self, message, permanent=False):
+        super().__init__(message)
+        self.permanent = permanent
+
+
+def _seconds(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def delivery_nonce(key):
+    """
+    A stable message nonce for a delivery (Discord allows 25 characters). Sent
+    with enforce_nonce, so a retry Discord already accepted within the last
+    few minutes isn't posted a second time.
+    """
+    return hashlib.sha256(key.encode()).hexdigest()[:25]
+
+
+def _classify(exception):
+    """Turns a discord.py or aiohttp exception from a send into RouteRateLimited or DeliveryError."""
+    if isinstance(exception, (RouteRateLimited, DeliveryError)):
+        return exception
+    retry_after = getattr(exception, 'retry_after', None)  # discord.RateLimited
+    status = getattr(exception, 'status', None)
+    if retry_after is not None or status == 429:
+        return RouteRateLimited(retry_after if retry_after is not None else 1.0)
+    return DeliveryError(str(exception) or type(exception).__name__, permanent=status in PERMANENT_STATUSES)
+
+
+class RouteBucket:
+    """
+    One Discord rate-limit route. Requests on the route hold off until the
+    retry-after of its last 429 (or the reset of a spent quota) has passed.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self.blocked_until = 0.0
+        self.limited = 0
+
+    def block(self, seconds):
+        self.blocked_until = max(self.blocked_until, self._clock() + seconds)
+
+    def wait_time(self):
+        return max(0.0, self.blocked_until - self._clock())
+
+
+class Delivery:
+    """
+    One destination of a release announcement.
+
+    Args:
+        key (str): Unique and stable across restarts; what the state store records.
+        kind (str): 'rename', 'channel' or 'webhook', for metrics.
+        route (str): Rate-limit route; deliveries sharing one wait out each other's 429s.
+        send: Coroutine function taking the delivery's nonce. Returns None, or
+              seconds to hold off the route because its quota is spent.
+    """
+
+    def __init__(self, key, kind, route, send):
+        self.key = key
+        self.kind = kind
+        self.route = route
+        self.send = send
+        self.status = PENDING
+        self.attempts = 0
+        self.latency = None
+        self.error = None
+
+
+def channel_message_delivery(target_key, channel_id, content, get_channel):
+    """Posts content in a channel through the bot (get_channel returns the channel, or None)."""
+    key = f"{target_key}:channel:{channel_id}"
+
+    async def send(nonce):
+        channel = get_channel(channel_id)
+        if channel is None:
+            raise DeliveryError(f"channel {channel_id} not found")
+        await channel.send(content, nonce=nonce)
+
+    return Delivery(key, 'channel', f"POST /channels/{channel_id}/messages", send)
+
+
+def webhook_delivery(target_key, url, content, get_session):
+    """
+    Posts content through a webhook URL with the shared aiohttp session
+    (get_session returns it). Discord's 429s and rate-limit headers are
+    handled here, since the request doesn't go through discord.py.
+    """
+    parts = urlparse(url).path.rstrip('/').split('/')
+    webhook_id = parts[-2] if len(parts) >= 2 else url
+    key = f"{target_key}:webhook:{webhook_id}"  # No token, so the state store never holds one
+
+    async def send(nonce):
+        session = get_session()
+        if session is None or session.closed:
+            raise DeliveryError("no open HTTP session")
+        payload = {'content': content, 'allowed_mentions': {'parse': ['everyone']}}
+        async with session.post(url, params={'wait': 'true'}, json=payload) as response:
+            if response.status == 429:
+                try:
+                    body = await response.json(content_type=None)
+                except Exception:
+                    body = {}
+                retry_after = _seconds(body.get('retry_after', response.headers.get('Retry-After')))
+                is_global = bool(body.get('global')) or response.headers.get('X-RateLimit-Global') == 'true'
+                raise RouteRateLimited(retry_after if retry_after is not None else 1.0, is_global)
+            if response.status >= 400:
+                raise DeliveryError(f"webhook {webhook_id} answered HTTP {response.status}",
+                                    permanent=response.status in PERMANENT_STATUSES)
+            if response.headers.get('X-RateLimit-Remaining') == '0':
+                return _seconds(response.headers.get('X-RateLimit-Reset-After'))
+        return None
+
+    return Delivery(key, 'webhook', f"webhook:{webhook_id}", send)
+
+
+class AnnouncementDispatcher:
+    """
+    Sends one announcement to many destinations at once.
+
+    At most `concurrency` sends are in flight; each rate-limit route has its
+    own RouteBucket, so a 429 on one channel or webhook only holds back that
+    route (or everything, for a global 429). Other failures are retried with
+    jittered exponential backoff, up to max_attempts per dispatch.
+
+    Every outcome is recorded in the state store, and deliveries already
+    delivered (or refused for good) are skipped on later dispatches, so a
+    restart or a re-run after partial failure only sends what's missing.
+    """
+
+    def __init__(self, store=None, concurrency=ANNOUNCE_CONCURRENCY, max_attempts=ANNOUNCE_MAX_ATTEMPTS,
+                 retry_base=ANNOUNCE_RETRY_BASE, clock=time.monotonic, sleep=asyncio.sleep):
+        self.store = store  # StateStore, or None to only remember deliveries in memory
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max(1, max_attempts)
+        self.retry_base = retry_base
+        self._clock = clock
+        self._sleep = sleep
+        self._semaphore = None
+        self._buckets = {}  # route -> RouteBucket
+        self._global = RouteBucket(clock)
+        self._done = {}     # delivery key -> (status, attempts), for dispatches without a store
+        self.reports = {}   # target key -> report of its last dispatch
+
+    async def _load_done(self, target_key):
+        if self.store is None:
+            return dict(self._done)
+        try:
+            return {key: (row['status'], row['attempts'])
+                    for key, row in (await self.store.load_deliveries_async(target_key)).items()}
+        except Exception as e:
+            print(f"Error loading announcement deliveries: {e}")
+            return dict(self._done)
+
+    async def _record(self, target_key, delivery):
+        self._done[delivery.key] = (delivery.status, delivery.attempts)
+        if self.store is None:
+            return
+        try:
+            await self.store.record_delivery_async(delivery.key, target_key, delivery.status, delivery.attempts,
+                                                   delivery.latency)
+        except Exception as e:
+            print(f"Error recording announcement delivery {delivery.key}: {e}")
+
+    async def dispatch(self, target_key, deliveries, started=None):
+        """
+        Delivers everything in deliveries not already delivered, all at once.
+
+        Args:
+            target_key (str): The target being announced; groups its deliveries in the state store.
+            deliveries (list[Delivery]): Destinations. Duplicate keys are sent once.
+            started (float, optional): clock() time latencies are measured from. Defaults to now.
+        Returns:
+            dict: Report with 'complete' (nothing left to retry), counts by status,
+                  'seconds' and one row per delivery with its latency and attempts.
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        started = self._clock() if started is None else started
+        done = await self._load_done(target_key)
+
+        unique = {}
+        for delivery in deliveries:
+            unique.setdefault(delivery.key, delivery)
+        to_send = []
+        for delivery in unique.values():
+            status, delivery.attempts = done.get(delivery.key, (PENDING, 0))
+            if status in (DELIVERED, FAILED):
+                delivery.status = status
+            else:
+                to_send.append(delivery)
+        await asyncio.gather(*(self._deliver(target_key, delivery, started) for delivery in to_send))
+
+        report = self._report(target_key, list(unique.values()), len(unique) - len(to_send), started)
+        self.reports[target_key] = report
+        self._log(report)
+        return report
+
+    async def _deliver(self, target_key, delivery, started):
+        bucket = self._buckets.setdefault(delivery.route, RouteBucket(self._clock))
+        nonce = delivery_nonce(delivery.key)
+        attempts = 0
+        while attempts < self.max_attempts:
+            wait = max(bucket.wait_time(), self._global.wait_time())
+            if wait > 0:
+                await self._sleep(wait)
+                continue
+            async with self._semaphore:
+                # Another delivery on this route may have been limited while this one queued
+                if bucket.wait_time() > 0 or self._global.wait_time() > 0:
+                    continue
+                attempts += 1
+                delivery.attempts += 1
+                try:
+                    hold_off = await delivery.send(nonce)
+                    error = None
+                except Exception as e:
+                    error = _classify(e)
+
+            if error is not None:
+                delivery.error = str(error)
+                if isinstance(error, RouteRateLimited):
+                    ANNOUNCEMENTS.inc(kind=delivery.kind, outcome='rate_limited')
+                    bucket.limited += 1
+                    (self._global if error.is_global else bucket).block(error.retry_after)
+                    continue
+                if error.permanent:
+                    ANNOUNCEMENTS.inc(kind=delivery.kind, outcome='refused')
+                    delivery.status = FAILED
+                    await self._record(target_key, delivery)
+                    return
+                ANNOUNCEMENTS.inc(kind=delivery.kind, outcome='error')
+                if attempts < self.max_attempts:
+                    backoff = min(ANNOUNCE_RETRY_MAX, self.retry_base * 2 ** (attempts - 1))
+                    await self._sleep(backoff * random.uniform(0.5, 1.0))
+                continue
+
+            if hold_off:
+                bucket.block(hold_off)
+            ANNOUNCEMENTS.inc(kind=delivery.kind, outcome='ok')
+            delivery.status = DELIVERED
+            delivery.latency = self._clock() - started
+            delivery.error = None
+            ANNOUNCEMENT_SECONDS.observe(delivery.latency, kind=delivery.kind)
+            await self._record(target_key, delivery)
+            return
+
+        # Out of attempts for now; still pending, so the next dispatch tries again
+        await self._record(target_key, delivery)
+
+    def _report(self, target_key, deliveries, skipped, started):
+        counts = {DELIVERED: 0, FAILED: 0, PENDING: 0}
+        for delivery in deliveries:
+            counts[delivery.status] += 1
+        latencies = sorted(delivery.latency for delivery in deliveries if delivery.latency is not None)
+        return {
+            'target': target_key,
+            'complete': counts[PENDING] == 0,
+            'delivered': counts[DELIVERED],
+            'failed': counts[FAILED],
+            'pending': counts[PENDING],
+            'skipped': skipped,
+            'seconds': round(self._clock() - started, 3),
+            'p50_s': round(latencies[len(latencies) // 2], 3) if latencies else None,
+            'max_s': round(latencies[-1], 3) if latencies else None,
+            'deliveries': [
+                {
+                    'key': delivery.key,
+                    'kind': delivery.kind,
+                    'status': delivery.status,
+                    'attempts': delivery.attempts,
+                    'latency_s': round(delivery.latency, 3) if delivery.latency is not None else None,
+                    'error': delivery.error,
+                }
+                for delivery in deliveries
+            ],
+        }
+
+    def _log(self, report):
+        sent = report['delivered'] + report['failed'] + report['pending'] - report['skipped']
+        if not sent:
+            return
+        timing = f", p50 {report['p50_s']}s, max {report['max_s']}s" if report['max_s'] is not None else ""
+        print(f"Announced {report['target']}: {report['delivered']} delivered, {report['failed']} refused, "
+              f"{report['pending']} still pending, {report['skipped']} already done ({report['seconds']}s{timing}).")
+        for row in report['deliveries']:
+            if row['status'] != DELIVERED and row['error']:
+                print(f"  {row['key']}: {row['status']} after {row['attempts']} attempt(s): {row['error']}")
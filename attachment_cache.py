@@ -0,0 +1,137 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qs, urlparse
+
+# --- Configuration ---
+_cache_channel_id = os.getenv('IMAGE_CACHE_CHANNEL_ID')
+IMAGE_CACHE_CHANNEL_ID = int(_cache_channel_id) if _cache_channel_id else None  # Unset: upload every reply
+ATTACHMENT_CACHE_SIZE = int(os.getenv('ATTACHMENT_CACHE_SIZE', '256'))
+ATTACHMENT_URL_TTL = float(os.getenv('ATTACHMENT_URL_TTL', '43200'))  # Seconds a URL is trusted when it has no expiry
+ATTACHMENT_URL_MARGIN = 600  # Re-upload this many seconds before a signed URL expires
+
+
+def attachment_url_expiry(url, uploaded_at, ttl=ATTACHMENT_URL_TTL):
+    """
+    When an attachment URL stops working: the hex Unix time in Discord's
+    signed "ex" query parameter, or uploaded_at + ttl for unsigned URLs.
+    """
+    try:
+        return int(parse_qs(urlparse(url).query)['ex'][0], 16)
+    except (KeyError, IndexError, ValueError):
+        return uploaded_at + ttl
+
+
+class AttachmentCache:
+    """
+    Uploads each distinct image once to a cache channel and remembers its
+    attachment URL, so replies can reference the image from an embed instead
+    of uploading it again.
+
+    Like RenderCache, concurrent requests for a key that is still uploading
+    await that upload instead of starting their own. URLs are dropped shortly
+    before they expire, or when their message in the cache channel is deleted
+    (see invalidate_message), and uploaded again on the next request.
+    """
+
+    def __init__(self, get_channel, max_entries=ATTACHMENT_CACHE_SIZE, clock=time.time):
+        self._get_channel = get_channel  # Returns the cache channel, or None if it isn't available
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (url, expires_at, message_id)
+        self._keys_by_message = {}     # message_id -> key
+        self._in_flight = {}           # key -> asyncio.Future
+        self.hits = 0
+        self.uploads = 0
+        self.coalesced = 0
+        self.failures = 0
+
+    def invalidate(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._keys_by_message.pop(entry[2], None)
+
+    def invalidate_message(self, message_id):
+        """Drops the URL uploaded in message_id, e.g. because the message was deleted. Returns True if there was one."""
+        key = self._keys_by_message.pop(message_id, None)
+        if key is None:
+            return False
+        self._entries.pop(key, None)
+        return True
+
+    async def get_url(self, key, make_file):
+        """
+        Returns the attachment URL for key's image, awaiting make_file() (a
+        coroutine function returning a discord.File or None) and uploading
+        the result when there isn't a fresh URL yet.
+
+        Returns None when the image can't be uploaded to the cache channel, so
+        the caller can fall back to sending the file itself. Exceptions from
+        make_file propagate.
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[1] - ATTACHMENT_URL_MARGIN > self._clock():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.invalidate(key)
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            # shield: one waiter being cancelled mustn't cancel the shared upload
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            uploaded = await self._upload(make_file)
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        else:
+            url, message_id = uploaded
+            future.set_result(url)
+            if url is not None:
+                self._store(key, url, message_id)
+            return url
+        finally:
+            del self._in_flight[key]
+
+    async def _upload(self, make_file):
+        """Returns (url, message_id) of the upload, or (None, None) if it failed."""
+        channel = self._get_channel()
+        if channel is None:
+            self.failures += 1
+            return None, None
+        file = await make_file()
+        if file is None:
+            return None, None
+        self.uploads += 1
+        try:
+            message = await channel.send(file=file)
+            return message.attachments[0].url, message.id
+        except Exception as e:
+            print(f"Error uploading image to the cache channel: {e}")
+            self.failures += 1
+            return None, None
+
+    def _store(self, key, url, message_id):
+        self.invalidate(key)
+        self._entries[key] = (url, attachment_url_expiry(url, self._clock()), message_id)
+        self._keys_by_message[message_id] = key
+        while len(self._entries) > self.max_entries:
+            _, (_, _, evicted_message_id) = self._entries.popitem(last=False)
+            self._keys_by_message.pop(evicted_message_id, None)
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'uploads': self.uploads,
+            'coalesced': self.coalesced,
+            'failures': self.failures,
+            'entries': len(self._entries),
+        }
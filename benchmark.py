@@ -0,0 +1,162 @@
+"""
+Offline benchmark for the countdown image pipeline.
+
+Measures render+encode latency (p50/p95), peak traced memory, output size and
+throughput for the countdown and released images, cold (caches dropped before
+every render) and warm, using the bundled assets. Prints JSON so runs can be
+saved and compared:
+
+    python benchmark.py --iterations 200 --workers 4 --output bench.json
+"""
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+
+import PIL
+
+import countdown
+
+# Fixed inputs so every run renders exactly the same images
+BENCH_TIMER_TEXT = "12 : 03 : 07 : 41"
+BENCH_DATE_TEXT = "Releasing on June 4, 2025"
+STATES = {
+    'countdown': (False, BENCH_TIMER_TEXT),
+    'released': (True, "Released!"),
+}
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _render(game_released, timer_text, output_format):
+    return countdown.render_countdown_bytes(game_released, timer_text, BENCH_DATE_TEXT, output_format)
+
+
+def measure_latency(game_released, timer_text, output_format, iterations, cold):
+    """Returns (latency stats in ms, last output bytes)."""
+    if not cold:
+        _render(game_released, timer_text, output_format)  # Warm-up render, not timed
+
+    samples = []
+    data = None
+    for _ in range(iterations):
+        if cold:
+            countdown.reset_caches()
+        start = time.perf_counter()
+        data = _render(game_released, timer_text, output_format)
+        samples.append((time.perf_counter() - start) * 1000)
+
+    return {
+        'p50_ms': round(_percentile(samples, 0.50), 3),
+        'p95_ms': round(_percentile(samples, 0.95), 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        'min_ms': round(min(samples), 3),
+    }, data
+
+
+def measure_peak_memory(game_released, timer_text, output_format, cold):
+    """
+    Peak bytes allocated during one render, as seen by tracemalloc (Python
+    allocations only; Pillow's own image buffers aren't traced).
+    """
+    if cold:
+        countdown.reset_caches()
+    else:
+        _render(game_released, timer_text, output_format)
+    tracemalloc.start()
+    try:
+        _render(game_released, timer_text, output_format)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak
+
+
+def measure_throughput(game_released, timer_text, output_format, renders, workers, executor_kind):
+    """Renders per second with workers in a thread or process pool (workers=1 means inline)."""
+    if workers <= 1:
+        _render(game_released, timer_text, output_format)
+        start = time.perf_counter()
+        for _ in range(renders):
+            _render(game_released, timer_text, output_format)
+        return renders / (time.perf_counter() - start)
+
+    if executor_kind == 'process':
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=countdown.warm_up)
+    else:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    with executor:
+        # Make sure every worker exists and is warm before timing
+        list(executor.map(_render, [game_released] * workers, [timer_text] * workers, [output_format] * workers))
+        start = time.perf_counter()
+        list(executor.map(_render, [game_released] * renders, [timer_text] * renders, [output_format] * renders))
+        return renders / (time.perf_counter() - start)
+
+
+def run_benchmarks(iterations=100, cold_iterations=20, workers=None, executor_kind='process', output_format='png'):
+    workers = workers or os.cpu_count() or 1
+    results = {
+        'meta': {
+            'python': platform.python_version(),
+            'pillow': PIL.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'output_format': output_format,
+            'iterations': iterations,
+            'cold_iterations': cold_iterations,
+            'workers': workers,
+            'executor': executor_kind,
+        },
+        'states': {},
+    }
+
+    for state, (game_released, timer_text) in STATES.items():
+        state_results = {}
+        for phase, cold, count in (('cold', True, cold_iterations), ('warm', False, iterations)):
+            latency, data = measure_latency(game_released, timer_text, output_format, count, cold)
+            state_results[phase] = {
+                **latency,
+                'peak_memory_bytes': measure_peak_memory(game_released, timer_text, output_format, cold),
+            }
+        state_results['output_bytes'] = len(data) if data else 0
+        # Changes whenever the rendered output changes, to catch rendering regressions
+        state_results['output_sha256'] = hashlib.sha256(data).hexdigest() if data else None
+        state_results['renders_per_second'] = {
+            'single': round(measure_throughput(game_released, timer_text, output_format, iterations, 1, executor_kind), 1),
+            f'{workers}_workers': round(measure_throughput(game_released, timer_text, output_format, iterations * workers,
+                                                           workers, executor_kind), 1),
+        }
+        results['states'][state] = state_results
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the countdown image pipeline.")
+    parser.add_argument('--iterations', type=int, default=100, help="Warm renders per state (default: 100)")
+    parser.add_argument('--cold-iterations', type=int, default=20, help="Cold renders per state (default: 20)")
+    parser.add_argument('--workers', type=int, default=None, help="Workers for the throughput run (default: CPU count)")
+    parser.add_argument('--executor', choices=('thread', 'process'), default='process',
+                        help="Pool type for the throughput run (default: process)")
+    parser.add_argument('--format', choices=countdown.OUTPUT_FORMATS, default='png', help="Output format (default: png)")
+    parser.add_argument('--output', help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.iterations, args.cold_iterations, args.workers, args.executor, args.format)
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,205 +1,457 @@
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 from discord import app_commands
 import datetime
+import pytz
 import os
-import aiohttp
-import asyncio
-import json
+from typing import Optional
 from dotenv import load_dotenv
-from countdown import create_countdown_image # Correctly imported
+from countdown import (ANIMATION_FRAMES, animation_filename, get_timer_text,
+                       get_timer_texts, image_filename, render_countdown_animation, render_countdown_bytes,
+                       resolve_animation_format, resolve_output_format)
+from frame_cache import FRAME_CACHE_DIR, FRAME_CACHE_MINUTES, FRAME_CACHE_REFILL, FrameCache, frame_key, warm_async
+from render_cache import RenderCache
+from render_pool import RenderPool, RenderPoolBusy
+from attachment_cache import IMAGE_CACHE_CHANNEL_ID, AttachmentCache
+from announcements import AnnouncementDispatcher, Delivery, DeliveryError, channel_message_delivery, webhook_delivery
+from channel_schedule import TRANSITION_SLACK, channel_name_for, next_name_transition
+from localization import LOCALES, image_texts, is_valid_timezone, render_variant, resolve_locale, translate
+from metrics import (COUNTDOWN_SECONDS, REGISTRY, channel_edit_outcome, record_channel_edit, sample_event_loop_lag,
+                     start_metrics_server)
+from polling import SteamPollScheduler
+from profiler import PROFILE_MAX_SECONDS, ProfileInProgress, install_signal_handler, profile_for, write_report
+from scheduler import TimerHeapScheduler
+from state_store import STATE_DB, StateStore
+from steam import SteamReleaseStatus, create_http_session
+from targets import DEFAULT_RELEASE_DATE, DEFAULT_STEAM_APP_ID, DEFAULT_TARGET_KEY, DEFAULT_TIMEZONE, load_targets
+from themes import theme_version
+import asyncio
+import hashlib
 import io
-import pytz # Import pytz
+import json
+import time
 
 # Load environment variables
 load_dotenv()
 
 # Bot configuration
 TOKEN = os.getenv('DISCORD_TOKEN')
-CHANNEL_ID = int(os.getenv('COUNTDOWN_CHANNEL_ID'))
+_channel_id = os.getenv('COUNTDOWN_CHANNEL_ID')
+CHANNEL_ID = int(_channel_id) if _channel_id else None
 # Set RELEASE_DATE to midnight of the specific day in Japan timezone
-JAPAN_TIMEZONE = pytz.timezone('Asia/Tokyo')
-RELEASE_DATE_JST = datetime.datetime(2025, 6, 5, 0, 0, 0, tzinfo=JAPAN_TIMEZONE) # Midnight JST
+JAPAN_TIMEZONE = DEFAULT_TIMEZONE
+RELEASE_DATE_JST = DEFAULT_RELEASE_DATE # Midnight JST
+
+STEAM_APP_ID = DEFAULT_STEAM_APP_ID  # Deltarune's Steam App ID
+STATE_FILE = "deltarune_bot_state.json"  # Old JSON state file, imported into STATE_DB once
+
+# Fallback wait when a countdown channel isn't available yet
+CHANNEL_RETRY_SECONDS = 300
+
+# State database meta entry holding the hash of the last synced command tree
+COMMAND_TREE_HASH_KEY = "command_tree_hash"
 
-STEAM_APP_ID = "1671210"  # Deltarune's Steam App ID
-STATE_FILE = "deltarune_bot_state.json"  # File to store state
+# Every countdown the bot runs, by key (see targets.py)
+targets = load_targets(fallback_channel_id=CHANNEL_ID)
 
 # Set up intents
 intents = discord.Intents.default()
 intents.message_content = True # Only if you use message content commands, not needed for slash commands only
 
-# Initialize bot
-bot = commands.Bot(command_prefix='!', intents=intents) # Prefix not strictly needed for slash-only bot
-
-# Game release status (global, managed by tasks and API checks)
-game_released = False
+class CountdownBot(commands.Bot):
+    """Owns the shared HTTP session, the metrics endpoint and the loop-lag sampler for the lifetime of the bot."""
+
+    http_session = None
+    metrics_runner = None
+    lag_sampler = None
+    render_warmup = None
+
+    async def setup_hook(self):
+        self.http_session = create_http_session()
+        for steam_status in steam_statuses.values():
+            steam_status.session = self.http_session
+        await load_state()
+        await open_frame_cache()
+        # setup_hook runs once per process, unlike on_ready which also fires on every reconnect
+        await sync_commands_if_changed()
+        self.lag_sampler = asyncio.create_task(sample_event_loop_lag())
+        try:
+            self.metrics_runner = await start_metrics_server()
+        except Exception as e:
+            print(f"Error starting metrics endpoint: {e}")
+        if install_signal_handler():
+            print("Send SIGUSR1 to write a profile of the running bot.")
+
+    async def close(self):
+        scheduler.stop()
+        for task in (self.lag_sampler, self.render_warmup):
+            if task is not None:
+                task.cancel()
+        await super().close()
+        if self.metrics_runner is not None:
+            await self.metrics_runner.cleanup()
+        if self.http_session is not None:
+            await self.http_session.close()
+        if state_store is not None:
+            state_store.close()
 
-# Message tracking variables - we'll load these from file
-tomorrow_message_sent = False
-release_message_sent = False
 
-def load_state():
-    global tomorrow_message_sent, release_message_sent, game_released
+# Initialize bot
+bot = CountdownBot(command_prefix='!', intents=intents) # Prefix not strictly needed for slash-only bot
+
+# One cached Steam release status and poll scheduler per Steam app, so targets
+# counting down to the same game share a single stream of Steam checks
+steam_statuses = {}
+steam_poll_schedulers = {}
+for _target in targets.values():
+    _app_id = _target.steam_app_id
+    steam_statuses.setdefault(_app_id, SteamReleaseStatus(_app_id))
+    if _app_id not in steam_poll_schedulers or _target.release_date < steam_poll_schedulers[_app_id].release_date:
+        steam_poll_schedulers[_app_id] = SteamPollScheduler(_target.release_date)
+
+# Channel renames and Steam polls for every target run from this one timer heap;
+# one that fails unexpectedly is retried after CHANNEL_RETRY_SECONDS
+scheduler = TimerHeapScheduler(retry_delay=CHANNEL_RETRY_SECONDS)
+
+# Per-target state (announcement flags, channel names); opened in setup_hook
+state_store = None
+# user id -> {'timezone': ..., 'locale': ...} set with /settings, loaded in setup_hook
+user_prefs = {}
+
+# Encoded /countdown images, shared by everyone asking within the same second
+render_cache = RenderCache()
+# Rendering runs here so Pillow never blocks the gateway loop
+render_pool = RenderPool(warm_releases=[(target.release_date, target.theme) for target in targets.values()])
+# Attachment URLs of images already uploaded to the image cache channel, if one is configured
+attachment_cache = AttachmentCache(lambda: bot.get_channel(IMAGE_CACHE_CHANNEL_ID)) if IMAGE_CACHE_CHANNEL_ID else None
+# Still images pre-rendered ahead of time (see frame_cache.py); opened in setup_hook
+frame_cache = None
+# Sends release announcements to every destination at once; records deliveries in the state store
+announcer = AnnouncementDispatcher()
+
+REGISTRY.gauge('render_cache_lookups', "Render cache lookups since start, by result",
+               lambda: {(('result', result),): render_cache.stats()[result] for result in ('hits', 'misses', 'coalesced')})
+REGISTRY.gauge('render_cache_entries', "Encoded images held in the render cache", lambda: render_cache.stats()['entries'])
+REGISTRY.gauge('frame_cache_lookups', "Frame cache lookups since start, by result",
+               lambda: {(('result', result),): frame_cache.stats()[result] for result in ('hits', 'misses')} if frame_cache else {})
+REGISTRY.gauge('attachment_cache_lookups', "Image cache channel lookups since start, by result",
+               lambda: {(('result', result),): attachment_cache.stats()[result]
+                        for result in ('hits', 'uploads', 'coalesced', 'failures')} if attachment_cache else {})
+REGISTRY.gauge('render_pool_pending', "Renders running or queued in the render pool", lambda: render_pool.pending)
+REGISTRY.gauge('scheduler_pending_events', "Events waiting in the timer heap", lambda: len(scheduler))
+
+
+async def load_state():
+    """Opens the state database (importing the old JSON state file once) and loads every target's state."""
+    global state_store
     try:
-        if os.path.exists(STATE_FILE):
-            with open(STATE_FILE, 'r') as f:
-                state = json.load(f)
-                tomorrow_message_sent = state.get('tomorrow_message_sent', False)
-                release_message_sent = state.get('release_message_sent', False)
-                game_released = state.get('game_released', False)
-                print(f"Loaded state: tomorrow_message_sent={tomorrow_message_sent}, release_message_sent={release_message_sent}, game_released={game_released}")
-        else:
-            print("State file not found, starting with default state.")
+        state_store = StateStore(STATE_DB)
+        announcer.store = state_store
+        await state_store.run(state_store.import_json_once, STATE_FILE, DEFAULT_TARGET_KEY)
+        stored = await state_store.load_all_async()
+        for target in targets.values():
+            target_state = stored.get(target.key)
+            if target_state is None:
+                continue
+            target.tomorrow_message_sent = target_state['tomorrow_message_sent']
+            target.release_message_sent = target_state['release_message_sent']
+            target.game_released = target_state['game_released']
+            target.channel_name = target_state['channel_name']
+            print(f"Loaded state for {target.key}: tomorrow_message_sent={target.tomorrow_message_sent}, "
+                  f"release_message_sent={target.release_message_sent}, game_released={target.game_released}")
+        if not stored:
+            print("No saved state found, starting with default state.")
+        user_prefs.update(await state_store.load_user_prefs_async())
     except Exception as e:
         print(f"Error loading state: {e}. Using default state.")
-        tomorrow_message_sent = False
-        release_message_sent = False
-        game_released = False
+        for target in targets.values():
+            target.tomorrow_message_sent = False
+            target.release_message_sent = False
+            target.game_released = False
 
 
-def save_state():
+async def save_state(target):
+    """Upserts one target's row in the state database."""
+    if state_store is None:
+        print("Error saving state: state database is not open.")
+        return
     try:
-        state = {
-            'tomorrow_message_sent': tomorrow_message_sent,
-            'release_message_sent': release_message_sent,
-            'game_released': game_released
-        }
-        with open(STATE_FILE, 'w') as f:
-            json.dump(state, f, indent=4)
-            print("State saved to file")
+        await state_store.upsert_async(
+            target.key,
+            game_released=target.game_released,
+            tomorrow_message_sent=target.tomorrow_message_sent,
+            release_message_sent=target.release_message_sent,
+            channel_name=target.channel_name,
+        )
     except Exception as e:
         print(f"Error saving state: {e}")
 
-@bot.event
-async def on_ready():
-    print(f'{bot.user} has connected to Discord!')
-    load_state()
-
-    if not game_released or not release_message_sent:
-        update_countdown.start()
-        check_steam_status.start()
-        print("Countdown and Steam check tasks started.")
-    else:
-        print("Game already marked as released and announced. Tasks not started.")
-        channel = bot.get_channel(CHANNEL_ID)
-        if channel and not channel.name.endswith("-is-out-now"):
-             try:
-                await channel.edit(name="deltarune-is-out-now")
-                print("Corrected channel name to 'deltarune-is-out-now' on restart.")
-             except Exception as e:
-                print(f"Could not correct channel name on restart: {e}")
 
+async def rename_channel(channel, name):
+    """channel.edit(name=name), counting the outcome in channel_edits_total. Exceptions propagate."""
     try:
-        synced = await bot.tree.sync()
-        print(f"Synced {len(synced)} command(s)")
+        await channel.edit(name=name)
     except Exception as e:
-        print(f"Error syncing commands: {e}")
+        record_channel_edit(channel_edit_outcome(e))
+        raise
+    record_channel_edit('ok')
+
 
-async def is_game_released_from_steam():
+PRERENDER_KEY = "prerender"
+
+
+async def open_frame_cache():
+    """Opens the frame cache if pre-rendering is on or the CLI has warmed one."""
+    global frame_cache
+    if FRAME_CACHE_MINUTES <= 0 and not os.path.exists(FRAME_CACHE_DIR):
+        return
     try:
-        async with aiohttp.ClientSession() as session:
-            url = f"https://store.steampowered.com/api/appdetails?appids={STEAM_APP_ID}"
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if STEAM_APP_ID in data and data[STEAM_APP_ID]['success']:
-                        game_data = data[STEAM_APP_ID]['data']
-                        if not game_data.get('release_date', {}).get('coming_soon', True):
-                            return True
+        frame_cache = await asyncio.to_thread(FrameCache, FRAME_CACHE_DIR)
+        print(f"Frame cache opened with {len(frame_cache)} pre-rendered frame(s).")
     except Exception as e:
-        print(f"Error checking Steam status: {e}")
-    return False
+        print(f"Error opening frame cache: {e}")
 
-@tasks.loop(minutes=1)
-async def check_steam_status():
-    global game_released, release_message_sent
 
-    if game_released and release_message_sent:
-        check_steam_status.cancel()
-        print("Steam check: Game already released and announced. Task stopping.")
-        return
+async def prerender_frames():
+    """Renders the next FRAME_CACHE_MINUTES of countdown images for every target, then reschedules itself."""
+    for target in targets.values():
+        if target.finished:
+            continue
+        try:
+            rendered = await warm_async(frame_cache, target.release_date, FRAME_CACHE_MINUTES, render_pool.run,
+                                        theme=target.theme)
+            if rendered:
+                print(f"Pre-rendered {rendered} frame(s) for {target.key}.")
+        except RenderPoolBusy:
+            break  # Requests come first; try again next pass
+        except Exception as e:
+            print(f"Error pre-rendering frames for {target.key}: {e}")
+    scheduler.schedule(PRERENDER_KEY, FRAME_CACHE_REFILL, prerender_frames)
 
-    steam_confirms_release = await is_game_released_from_steam()
 
-    if steam_confirms_release and not game_released:
-        print("Steam API confirms game is released!")
-        game_released = True
-        save_state()
+def rename_key(target):
+    return f"rename:{target.key}"
+
+
+def steam_key(app_id):
+    return f"steam:{app_id}"
 
-    if game_released and not release_message_sent:
-        channel = bot.get_channel(CHANNEL_ID)
-        if channel:
-            try:
-                new_name = "deltarune-is-out-now"
-                if channel.name != new_name:
-                    await channel.edit(name=new_name)
-                print(f"Game released! Updated channel name to {new_name}")
-
-                await channel.send("@everyone **DELTARUNE IS OUT NOW!** \n" +
-                                  f"https://store.steampowered.com/app/{STEAM_APP_ID}/DELTARUNE/")
-                print("Sent release announcement.")
-                release_message_sent = True
-                save_state()
-
-                update_countdown.cancel()
-                check_steam_status.change_interval(hours=24)
-                print("Cancelled update_countdown task. Reduced check_steam_status frequency.")
-            except Exception as e:
-                print(f"Error updating channel/sending message for release: {e}")
-    elif not steam_confirms_release and datetime.datetime.now(JAPAN_TIMEZONE) > RELEASE_DATE_JST + datetime.timedelta(days=1) :
-        check_steam_status.change_interval(hours=1)
-        print("Past release date, game not detected as out. Reducing Steam check frequency to hourly.")
 
+@bot.event
+async def on_raw_message_delete(payload):
+    # An image deleted from the cache channel leaves its cached URL dead
+    if attachment_cache is not None and payload.channel_id == IMAGE_CACHE_CHANNEL_ID:
+        attachment_cache.invalidate_message(payload.message_id)
+
+
+@bot.event
+async def on_raw_bulk_message_delete(payload):
+    if attachment_cache is not None and payload.channel_id == IMAGE_CACHE_CHANNEL_ID:
+        for message_id in payload.message_ids:
+            attachment_cache.invalidate_message(message_id)
 
-@tasks.loop(minutes=5)
-async def update_countdown():
-    global tomorrow_message_sent, game_released
 
-    if game_released:
-        print("Countdown update: Game is marked released. Task stopping.")
-        update_countdown.cancel()
+@bot.event
+async def on_ready():
+    print(f'{bot.user} has connected to Discord!')
+
+    for target in targets.values():
+        if not target.finished:
+            # on_ready also fires on reconnects; keep whatever is already scheduled
+            if not target.game_released and not scheduler.is_scheduled(rename_key(target)):
+                scheduler.schedule(rename_key(target), 0, lambda target=target: update_countdown(target))
+            app_id = target.steam_app_id
+            if not scheduler.is_scheduled(steam_key(app_id)):
+                scheduler.schedule(steam_key(app_id), 0, lambda app_id=app_id: check_steam_status(app_id))
+        else:
+            channel = bot.get_channel(target.channel_id)
+            out_now_name = f"{target.channel_prefix}-is-out-now"
+            if channel and not channel.name.endswith("-is-out-now"):
+                 try:
+                    target.rename_limiter.record()
+                    await rename_channel(channel, out_now_name)
+                    print(f"Corrected channel name to '{out_now_name}' on restart.")
+                    target.channel_name = out_now_name
+                    await save_state(target)
+                 except Exception as e:
+                    print(f"Could not correct channel name on restart: {e}")
+    if frame_cache is not None and FRAME_CACHE_MINUTES > 0 and not scheduler.is_scheduled(PRERENDER_KEY):
+        scheduler.schedule(PRERENDER_KEY, 0, prerender_frames)
+    scheduler.start()
+    print(f"Scheduler started with {len(scheduler)} pending event(s) for {len(targets)} target(s).")
+
+    if bot.render_warmup is None:
+        # Load fonts and build templates without holding up the rest of startup
+        bot.render_warmup = asyncio.create_task(render_pool.warm())
+
+
+def command_tree_hash():
+    """Hash of the slash commands as they'd be sent to Discord, for this application."""
+    commands_payload = sorted((command.to_dict(bot.tree) for command in bot.tree.get_commands()),
+                              key=lambda payload: payload['name'])
+    serialized = json.dumps([bot.application_id, commands_payload], sort_keys=True, default=str)
+    return hashlib.sha256(serialized.encode()).hexdigest()
+
+
+async def sync_commands_if_changed():
+    """Syncs the global command tree only when it differs from the last successful sync."""
+    try:
+        tree_hash = command_tree_hash()
+        if state_store is not None and await state_store.get_meta_async(COMMAND_TREE_HASH_KEY) == tree_hash:
+            print("Slash commands unchanged since the last sync; skipping sync.")
+            return
+        synced = await bot.tree.sync()
+        print(f"Synced {len(synced)} command(s)")
+        if state_store is not None:
+            await state_store.set_meta_async(COMMAND_TREE_HASH_KEY, tree_hash)
+    except Exception as e:
+        print(f"Error syncing commands: {e}")
+
+async def is_game_released_from_steam(app_id=STEAM_APP_ID, max_age=None):
+    return await steam_statuses[app_id].is_released(max_age=max_age)
+
+
+async def announce_release(target, started=None):
+    """
+    Renames the target's channel and posts the release announcement there and
+    in every extra channel and webhook, all at once (see announcements.py).
+    Deliveries that already went out, even before a restart, aren't repeated.
+
+    Returns:
+        bool: True once nothing is left to retry.
+    """
+    new_name = f"{target.channel_prefix}-is-out-now"
+    content = f"@everyone **{target.title.upper()} IS OUT NOW!** \n" + target.store_url
+
+    async def rename(nonce):
+        channel = bot.get_channel(target.channel_id)
+        if not channel:
+            raise DeliveryError(f"channel {target.channel_id} not found")
+        if channel.name != new_name:
+            # The release rename goes out regardless, but it still uses up the limit
+            target.rename_limiter.record()
+            await rename_channel(channel, new_name)
+
+    deliveries = [
+        Delivery(f"{target.key}:rename:{target.channel_id}", 'rename', f"PATCH /channels/{target.channel_id}", rename),
+        channel_message_delivery(target.key, target.channel_id, content, bot.get_channel),
+    ]
+    deliveries += [channel_message_delivery(target.key, channel_id, content, bot.get_channel)
+                   for channel_id in target.announce_channel_ids]
+    deliveries += [webhook_delivery(target.key, url, content, lambda: bot.http_session)
+                   for url in target.announce_webhooks]
+
+    report = await announcer.dispatch(target.key, deliveries, started)
+    if not report['complete']:
+        return False
+    if any(row['kind'] == 'rename' and row['status'] == 'delivered' for row in report['deliveries']):
+        print(f"{target.title} released! Updated channel name to {new_name}")
+        target.channel_name = new_name
+    target.release_message_sent = True
+    await save_state(target)
+
+    scheduler.cancel(rename_key(target))
+    return True
+
+
+async def check_steam_status(app_id):
+    """Polls Steam once for app_id on behalf of every target waiting on it, then schedules the next poll."""
+    app_targets = [target for target in targets.values() if target.steam_app_id == app_id and not target.finished]
+    if not app_targets:
+        print(f"Steam check for {app_id}: every target released and announced. Polling stopped.")
+        return
+
+    steam_status = steam_statuses[app_id]
+    steam_poll_scheduler = steam_poll_schedulers[app_id]
+
+    now = datetime.datetime.now(JAPAN_TIMEZONE)
+    steam_confirms_release = False
+    outcome = 'skipped'
+    if any(not target.game_released for target in app_targets) and steam_poll_scheduler.allow_poll():
+        # Always ask Steam here; /countdown callers share this request and its result
+        steam_confirms_release = await is_game_released_from_steam(app_id, max_age=0)
+        if steam_status.last_ok:
+            steam_poll_scheduler.record_success()
+            outcome = 'released' if steam_confirms_release else 'coming-soon'
+        else:
+            steam_poll_scheduler.record_failure()
+            outcome = 'rate-limited' if steam_status.last_http_status == 429 else 'error'
+
+    released_at = time.monotonic()
+    if steam_confirms_release:
+        newly_released = [target for target in app_targets if not target.game_released]
+        if newly_released:
+            print(f"Steam API confirms app {app_id} is released!")
+            for target in newly_released:
+                target.game_released = True
+                await save_state(target)
+
+    # Every target sharing the app is announced at once, not one after another
+    await asyncio.gather(*(announce_release(target, released_at) for target in app_targets
+                           if target.game_released and not target.release_message_sent))
+
+    if all(target.finished for target in app_targets):
+        print(f"Steam check for {app_id}: released and announced. Polling stopped.")
         return
 
-    channel = bot.get_channel(CHANNEL_ID)
+    retry_after = steam_status.last_retry_after if outcome == 'rate-limited' else None
+    delay, reason = steam_poll_scheduler.next_delay(now, retry_after)
+    steam_poll_scheduler.log_decision(now, outcome, steam_status.last_latency if outcome != 'skipped' else None,
+                                      delay, reason, steam_status.last_http_status if outcome != 'skipped' else None)
+    scheduler.schedule(steam_key(app_id), delay, lambda: check_steam_status(app_id))
+
+
+async def update_countdown(target):
+    """
+    Applies the target's current channel name, then schedules itself for the
+    next name transition (or for when the rename rate limit allows another
+    rename).
+    """
+    if target.game_released:
+        print(f"Countdown update for {target.key}: game is marked released. Updates stopping.")
+        return
+
+    reschedule = lambda: update_countdown(target)
+
+    channel = bot.get_channel(target.channel_id)
     if not channel:
-        print(f"Error: Could not find channel with ID {CHANNEL_ID} for countdown update.")
+        print(f"Error: Could not find channel with ID {target.channel_id} for countdown update.")
+        scheduler.schedule(rename_key(target), CHANNEL_RETRY_SECONDS, reschedule)
         return
 
     today = datetime.datetime.now(JAPAN_TIMEZONE)
-    delta = RELEASE_DATE_JST - today
-    total_seconds = delta.total_seconds()
-    hours_remaining = int(total_seconds // 3600)
-    days_remaining = delta.days
-
-    new_name = ""
+    new_name = channel_name_for(target.release_date, today, target.channel_prefix)
     send_message_content = None
 
-    if days_remaining > 1:
-        new_name = f"deltarune-in-{days_remaining}-days"
-    elif days_remaining == 1:
-        new_name = "deltarune-tomorrow"
-        if not tomorrow_message_sent:
-            target_dt_str_for_announcement = RELEASE_DATE_JST.strftime('%B %d, %Y at %I:%M %p %Z')
-            send_message_content = (f"@everyone **DELTARUNE LAUNCHES TOMORROW!** (Target: {target_dt_str_for_announcement})\n" +
-                                    "Get ready to play! The wait is almost over!")
-            tomorrow_message_sent = True
-            save_state()
-            print("Sent 'tomorrow' notification.")
-    elif days_remaining == 0 and hours_remaining > 0:
-        new_name = f"deltarune-in-{hours_remaining}-hours"
-    elif days_remaining == 0 and hours_remaining <= 0:
-        new_name = "deltarune-releases-today"
-    else:
-        new_name = "deltarune-check-steam"
+    if new_name == f"{target.channel_prefix}-tomorrow" and not target.tomorrow_message_sent:
+        target_dt_str_for_announcement = target.release_date.strftime('%B %d, %Y at %I:%M %p %Z')
+        send_message_content = (f"@everyone **{target.title.upper()} LAUNCHES TOMORROW!** (Target: {target_dt_str_for_announcement})\n" +
+                                "Get ready to play! The wait is almost over!")
+        target.tomorrow_message_sent = True
+        await save_state(target)
+        print(f"Sent 'tomorrow' notification for {target.key}.")
 
+    rename_wait = 0.0
     if new_name and channel.name != new_name:
-        try:
-            await channel.edit(name=new_name)
-            print(f"Updated channel name to {new_name}")
-        except discord.Forbidden:
-            print("Error: Bot doesn't have permission to edit channel name.")
-        except discord.HTTPException as e:
-            print(f"Error updating channel name: {e}")
+        rename_wait = target.rename_limiter.wait_time()
+        if rename_wait > 0:
+            # Too many renames lately; try again when allowed, by which point
+            # any transitions in between collapse into the latest name.
+            print(f"Rename to {new_name} deferred {rename_wait:.0f}s by the rename rate limit.")
+        else:
+            try:
+                target.rename_limiter.record()
+                await rename_channel(channel, new_name)
+                print(f"Updated channel name to {new_name}")
+                target.channel_name = new_name
+                await save_state(target)
+            except discord.Forbidden:
+                print("Error: Bot doesn't have permission to edit channel name.")
+            except Exception as e:
+                # Transient failure (HTTP error, dropped connection, timeout);
+                # retry rather than keep the stale name until the next transition.
+                rename_wait = max(CHANNEL_RETRY_SECONDS, target.rename_limiter.wait_time())
+                print(f"Error updating channel name: {e}. Retrying in {rename_wait:.0f}s.")
 
     if send_message_content:
         try:
@@ -207,78 +459,283 @@ async def update_countdown():
         except Exception as e:
             print(f"Error sending scheduled message: {e}")
 
+    if rename_wait > 0:
+        scheduler.schedule(rename_key(target), rename_wait, reschedule)
+        return
+
+    now = datetime.datetime.now(JAPAN_TIMEZONE)
+    transition = next_name_transition(target.release_date, now)
+    if transition is None:
+        # The name is final until Steam reports the release
+        print(f"Countdown update for {target.key}: no further channel name changes scheduled.")
+        return
+    scheduler.schedule_at(rename_key(target), transition + datetime.timedelta(seconds=TRANSITION_SLACK), reschedule, now)
+
+
+def resolve_target(interaction, key):
+    """Picks the target named key, else the one for this server, else the first configured one."""
+    if key and key in targets:
+        return targets[key]
+    if interaction.guild_id is not None:
+        for target in targets.values():
+            if target.guild_id == interaction.guild_id:
+                return target
+    return next(iter(targets.values()), None)
+
 
 @bot.tree.command(name="countdown", description="Get a visual countdown to Deltarune's release")
 @app_commands.allowed_installs(guilds=True, users=True)
 @app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
-async def countdown_command(interaction: discord.Interaction):
-    await interaction.response.defer(ephemeral=False)
-
-    global game_released
-
+@app_commands.describe(animated="Send a live-ticking animation instead of a still image",
+                       target="Which countdown to show (defaults to this server's)")
+async def countdown_command(interaction: discord.Interaction, animated: bool = False, target: Optional[str] = None):
+    started = time.perf_counter()
+    with COUNTDOWN_SECONDS.time(phase='defer'):
+        await interaction.response.defer(ephemeral=False)
+
+    prefs = user_prefs.get(getattr(interaction.user, 'id', None), {})
+    locale = resolve_locale(prefs.get('locale'))
     try:
-        current_release_status_for_image = game_released
+        countdown_target = resolve_target(interaction, target)
+        if countdown_target is None:
+            await interaction.followup.send("No countdowns are configured.", ephemeral=True)
+            return
+        release_date = countdown_target.release_date
+        title = countdown_target.title
+
+        current_release_status_for_image = countdown_target.game_released
 
         if not current_release_status_for_image:
-            steam_check_result = await is_game_released_from_steam()
+            with COUNTDOWN_SECONDS.time(phase='steam'):
+                steam_check_result = await is_game_released_from_steam(countdown_target.steam_app_id)
             if steam_check_result:
                 current_release_status_for_image = True
-                if not game_released:
-                    game_released = True
-                    save_state()
-
-        # This call will now use the countdown.py that generates a footnote
-        # because RELEASE_DATE_JST is timezone-aware.
-        image_buffer = create_countdown_image(
-            game_released=current_release_status_for_image,
-            target_date_override=RELEASE_DATE_JST
-        )
+                if not countdown_target.game_released:
+                    countdown_target.game_released = True
+                    await save_state(countdown_target)
+
+        # The image only depends on the release state, its texts (timer, date
+        # line, subtitle, footnote), the target's theme and the user's (UTC
+        # offset at release, locale) variant, so everyone asking within the
+        # same second with the same variant shares one render. The theme's version changes when it's
+        # edited, so cached images from before a reload aren't served.
+        theme = countdown_target.theme
+        # Checking the theme's files (and recompiling it after an edit) is
+        # blocking work, so it runs off the event loop
+        version = await asyncio.to_thread(theme_version, theme)
+        variant = render_variant(release_date, prefs.get('timezone'), locale)
+        subtitle_text, release_date_display_text, footnote_text, released_text = image_texts(release_date, variant)
+        if current_release_status_for_image:
+            timer_text = released_text
+        else:
+            timer_text = get_timer_text(False, release_date)
+
+        if animated and not current_release_status_for_image:
+            animation_format = resolve_animation_format()
+            timer_texts = get_timer_texts(release_date, ANIMATION_FRAMES)
+            filename = animation_filename("deltarune_status", animation_format)
+            cache_key = (current_release_status_for_image, timer_text, release_date_display_text, animation_format,
+                         subtitle_text, footnote_text, version,
+                         len(timer_texts))
+
+            async def render():
+                return await render_pool.run(render_countdown_animation, timer_texts, release_date_display_text, animation_format,
+                                             subtitle_text, footnote_text, theme)
+        else:
+            output_format = resolve_output_format()
+            filename = image_filename("deltarune_status", output_format)
+            cache_key = (current_release_status_for_image, timer_text, release_date_display_text, output_format,
+                         subtitle_text, footnote_text, version)
+
+            async def render():
+                return await render_pool.run(render_countdown_bytes, current_release_status_for_image, timer_text, release_date_display_text, output_format,
+                                             subtitle_text, footnote_text, theme)
+        if variant is not None:
+            cache_key += (variant,)
+
+        async def image_file():
+            # A pre-rendered still needs no render at all
+            if frame_cache is not None and variant is None and not (animated and not current_release_status_for_image):
+                prerendered = frame_cache.open(frame_key(*cache_key))
+                if prerendered is not None:
+                    return discord.File(fp=prerendered, filename=filename)
+            image_bytes = await render_cache.get_or_render(cache_key, render)
+            if image_bytes is None:
+                return None
+            return discord.File(fp=io.BytesIO(image_bytes), filename=filename)
+
+        image_url = None
+        file = None
+        try:
+            with COUNTDOWN_SECONDS.time(phase='render'):
+                if attachment_cache is not None:
+                    # Each distinct image is uploaded once; replies point at it from an embed
+                    image_url = await attachment_cache.get_url(cache_key, image_file)
+                if image_url is None:
+                    file = await image_file()
+        except RenderPoolBusy:
+            await interaction.followup.send(translate(locale, 'busy'), ephemeral=True)
+            return
 
-        if image_buffer is None:
-            await interaction.followup.send("Sorry, there was an error generating the countdown image.", ephemeral=True)
+        if image_url is None and file is None:
+            await interaction.followup.send(translate(locale, 'image_error'), ephemeral=True)
             return
 
-        image_buffer.seek(0)
-        file = discord.File(fp=image_buffer, filename="deltarune_status.png")
         text_message = ""
 
-        target_dt_str = RELEASE_DATE_JST.strftime('%B %d, %Y at %I:%M %p %Z')
-
         if current_release_status_for_image:
-            text_message = f"Deltarune is out now! Go play it! https://store.steampowered.com/app/{STEAM_APP_ID}/DELTARUNE/"
+            text_message = translate(locale, 'out_now', title=title, url=countdown_target.store_url)
         else:
             now = datetime.datetime.now(JAPAN_TIMEZONE)
-            delta = RELEASE_DATE_JST - now
+            delta = release_date - now
             total_seconds = delta.total_seconds()
             hours_remaining = int(total_seconds // 3600)
             days_remaining = delta.days
 
             if days_remaining > 1:
-                text_message = f"**{days_remaining} days** until Deltarune releases !"
+                text_message = translate(locale, 'days_until', days=days_remaining, title=title)
             elif days_remaining == 1:
-                text_message = f"**Deltarune releases tomorrow!**  Get ready!"
+                text_message = translate(locale, 'tomorrow', title=title)
             elif days_remaining == 0 and hours_remaining > 1:
-                text_message = f"**{hours_remaining} hours** until Deltarune releases !"
+                text_message = translate(locale, 'hours_until', hours=hours_remaining, title=title)
             elif days_remaining == 0 and hours_remaining == 1:
-                text_message = f"**{hours_remaining} hour** until Deltarune releases !"
+                text_message = translate(locale, 'hour_until', hours=hours_remaining, title=title)
             elif days_remaining == 0 and hours_remaining <= 0:
-                text_message = f"**Deltarune releases today!**  Keep an eye on Steam!"
+                text_message = translate(locale, 'today', title=title)
             else:
-                text_message = (f"The target release time has passed. "
-                                "It should be out or releasing very soon! Check Steam for the latest.")
-
-        await interaction.followup.send(content=text_message, file=file)
+                text_message = translate(locale, 'passed')
+
+        with COUNTDOWN_SECONDS.time(phase='upload'):
+            if image_url is not None:
+                embed = discord.Embed()
+                embed.set_image(url=image_url)
+                try:
+                    await interaction.followup.send(content=text_message, embed=embed)
+                except discord.HTTPException as e:
+                    # Discord rejected the embed reply (a dead image URL doesn't cause
+                    # this; see on_raw_message_delete); send the image itself this time
+                    print(f"Error replying with the cached image ({e}); uploading it instead.")
+                    attachment_cache.invalidate(cache_key)
+                    try:
+                        file = await image_file()
+                    except RenderPoolBusy:
+                        await interaction.followup.send(translate(locale, 'busy'), ephemeral=True)
+                        return
+                    if file is None:
+                        await interaction.followup.send(translate(locale, 'image_error'), ephemeral=True)
+                        return
+                    await interaction.followup.send(content=text_message, file=file)
+            else:
+                await interaction.followup.send(content=text_message, file=file)
+        COUNTDOWN_SECONDS.observe(time.perf_counter() - started, phase='total')
 
     except Exception as e:
         print(f"Error in countdown command: {e}")
         if not interaction.response.is_done():
-            await interaction.response.send_message("Sorry, I encountered an error processing your request.", ephemeral=True)
+            await interaction.response.send_message(translate(locale, 'error'), ephemeral=True)
         else:
-            await interaction.followup.send("Sorry, I encountered an error processing your request.", ephemeral=True)
+            await interaction.followup.send(translate(locale, 'error'), ephemeral=True)
+
+
+@countdown_command.autocomplete('target')
+async def countdown_target_autocomplete(interaction: discord.Interaction, current: str):
+    current = current.lower()
+    return [app_commands.Choice(name=f"{target.title} ({target.key})", value=target.key)
+            for target in targets.values()
+            if current in target.key.lower() or current in target.title.lower()][:25]
+
+
+@bot.tree.command(name="settings", description="Set the timezone and language your countdowns are shown in")
+@app_commands.allowed_installs(guilds=True, users=True)
+@app_commands.allowed_contexts(guilds=True, dms=True, private_channels=True)
+@app_commands.describe(timezone="Your timezone, e.g. America/New_York (leave out to keep the current one)",
+                       language="Language for countdown images and replies")
+@app_commands.choices(language=[app_commands.Choice(name=name, value=code) for code, name in LOCALES.items()])
+async def settings_command(interaction: discord.Interaction, timezone: Optional[str] = None,
+                           language: Optional[app_commands.Choice[str]] = None):
+    prefs = dict(user_prefs.get(interaction.user.id, {'timezone': None, 'locale': None}))
+    if timezone is not None:
+        if not is_valid_timezone(timezone):
+            await interaction.response.send_message(
+                translate(resolve_locale(prefs['locale']), 'settings_unknown_timezone', timezone=timezone), ephemeral=True)
+            return
+        prefs['timezone'] = timezone
+    if language is not None:
+        prefs['locale'] = language.value
+
+    locale = resolve_locale(prefs['locale'])
+    summary = {'timezone': prefs['timezone'] or translate(locale, 'timezone_unset'), 'language': LOCALES[locale]}
+    if timezone is None and language is None:
+        await interaction.response.send_message(translate(locale, 'settings_current', **summary), ephemeral=True)
+        return
+
+    try:
+        if state_store is not None:
+            await state_store.set_user_prefs_async(interaction.user.id, prefs['timezone'], prefs['locale'])
+        user_prefs[interaction.user.id] = prefs
+        await interaction.response.send_message(translate(locale, 'settings_saved', **summary), ephemeral=True)
+    except Exception as e:
+        print(f"Error saving settings for user {interaction.user.id}: {e}")
+        await interaction.response.send_message(translate(locale, 'error'), ephemeral=True)
+
+
+@settings_command.autocomplete('timezone')
+async def settings_timezone_autocomplete(interaction: discord.Interaction, current: str):
+    current = current.lower().replace(' ', '_')
+    return [app_commands.Choice(name=name, value=name)
+            for name in pytz.common_timezones if current in name.lower()][:25]
+
+
+@bot.tree.command(name="stats", description="Show the bot's latency and error metrics (bot owner only)")
+async def stats_command(interaction: discord.Interaction):
+    if not await bot.is_owner(interaction.user):
+        await interaction.response.send_message("Only the bot owner can use this command.", ephemeral=True)
+        return
+
+    summary = REGISTRY.summary() or "No metrics recorded yet."
+    cache = render_cache.stats()
+    summary += (f"\nrender cache: {cache['hits']} hits, {cache['misses']} misses, {cache['coalesced']} coalesced "
+                f"({cache['dedup_rate']:.0%} deduplicated), {cache['entries']} entries")
+    if len(summary) <= 1900:
+        await interaction.response.send_message(f"```\n{summary}\n```", ephemeral=True)
+    else:
+        # Too long for a message; send the full Prometheus dump instead
+        file = discord.File(fp=io.BytesIO(REGISTRY.render_prometheus().encode()), filename="metrics.txt")
+        await interaction.response.send_message("Metrics attached.", file=file, ephemeral=True)
+
+
+@bot.tree.command(name="profile", description="Profile the running bot for a few seconds (bot owner only)")
+@app_commands.describe(seconds=f"How long to sample, up to {PROFILE_MAX_SECONDS} seconds",
+                       slow_callback_ms="Also list asyncio callbacks that blocked the loop longer than this")
+async def profile_command(interaction: discord.Interaction, seconds: app_commands.Range[int, 1, PROFILE_MAX_SECONDS] = 10,
+                          slow_callback_ms: Optional[app_commands.Range[int, 1, 10000]] = None):
+    if not await bot.is_owner(interaction.user):
+        await interaction.response.send_message("Only the bot owner can use this command.", ephemeral=True)
+        return
+
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    try:
+        report = await profile_for(seconds, slow_callback_ms)
+    except ProfileInProgress:
+        await interaction.followup.send("A profile is already running.", ephemeral=True)
+        return
+
+    try:
+        path = await asyncio.to_thread(write_report, report)
+        note = f"Profile saved to `{path}`."
+    except Exception as e:
+        print(f"Error writing profile: {e}")
+        note = "Couldn't save the profile to disk."
+    file = discord.File(fp=io.BytesIO(report.encode()), filename="profile.txt")
+    await interaction.followup.send(note, file=file, ephemeral=True)
 
 
 if __name__ == "__main__":
-    if TOKEN is None or CHANNEL_ID is None:
-        print("Error: DISCORD_TOKEN or COUNTDOWN_CHANNEL_ID not found in .env file or environment variables.")
+    if TOKEN is None or not targets:
+        print("Error: DISCORD_TOKEN or COUNTDOWN_CHANNEL_ID not found in .env file or environment variables "
+              "(and no countdown targets file).")
     else:
-        bot.run(TOKEN)
+        try:
+            bot.run(TOKEN)
+        finally:
+            render_pool.shutdown()
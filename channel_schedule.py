@@ -0,0 +1,84 @@
+import collections
+import datetime
+import time
+
+# Discord allows 2 channel renames per channel every 10 minutes
+RENAME_LIMIT = 2
+RENAME_PERIOD = 600
+# Wake this long after a transition so the new name is already in effect
+TRANSITION_SLACK = 0.5
+# How far ahead next_name_transition looks, in hour steps
+_MAX_HOUR_STEPS = 48
+
+
+def channel_name_for(release_date, now, prefix="deltarune"):
+    """Returns the countdown channel name for the moment now."""
+    delta = release_date - now
+    total_seconds = delta.total_seconds()
+    hours_remaining = int(total_seconds // 3600)
+    days_remaining = delta.days
+
+    if days_remaining > 1:
+        return f"{prefix}-in-{days_remaining}-days"
+    elif days_remaining == 1:
+        return f"{prefix}-tomorrow"
+    elif days_remaining == 0 and hours_remaining > 0:
+        return f"{prefix}-in-{hours_remaining}-hours"
+    elif days_remaining == 0 and hours_remaining <= 0:
+        return f"{prefix}-releases-today"
+    else:
+        return f"{prefix}-check-steam"
+
+
+def next_name_transition(release_date, now):
+    """
+    Returns the moment at which channel_name_for next starts giving a
+    different name (the new name applies just after it), or None if the name
+    won't change again.
+
+    Every name boundary falls a whole number of hours before the release, so
+    only those instants need checking.
+    """
+    remaining = (release_date - now).total_seconds()
+    if remaining < 0:
+        return None
+
+    current = channel_name_for(release_date, now)
+    just_after = datetime.timedelta(microseconds=1)
+    hours_left = int(remaining // 3600)
+    for _ in range(_MAX_HOUR_STEPS):
+        candidate = release_date - datetime.timedelta(hours=hours_left)
+        if channel_name_for(release_date, candidate + just_after) != current:
+            return candidate
+        if hours_left == 0:
+            return None
+        hours_left -= 1
+    # Nothing changes within _MAX_HOUR_STEPS hours; check back then
+    return release_date - datetime.timedelta(hours=hours_left)
+
+
+class RenameRateLimiter:
+    """Tracks recent renames of one channel so we stay inside Discord's rename limit."""
+
+    def __init__(self, limit=RENAME_LIMIT, period=RENAME_PERIOD, clock=time.monotonic):
+        self.limit = limit
+        self.period = period
+        self._clock = clock
+        self._recent = collections.deque()
+
+    def _prune(self, now):
+        while self._recent and now - self._recent[0] >= self.period:
+            self._recent.popleft()
+
+    def wait_time(self):
+        """Seconds until another rename is allowed (0 if one is allowed now)."""
+        now = self._clock()
+        self._prune(now)
+        if len(self._recent) < self.limit:
+            return 0.0
+        return self.period - (now - self._recent[0])
+
+    def record(self):
+        now = self._clock()
+        self._prune(now)
+        self._recent.append(now)
@@ -1,40 +1,25 @@
-from PIL import Image, ImageDraw, ImageFont, ImageOps
+from PIL import Image, ImageChops, ImageDraw, ImageFont, ImageOps
 import datetime
 import os
 import math
 import io
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from targets import DEFAULT_RELEASE_DATE
+from themes import THEMES, ThemeError, get_plan
 # import pytz # Not strictly needed here if target_date_override is already aware
 
 # --- Configuration ---
-IMG_WIDTH = 600
-IMG_HEIGHT = 450
-BACKGROUND_COLOR = (0, 0, 0)  # Black
-TEXT_COLOR_WHITE = (255, 255, 255)
-TEXT_COLOR_YELLOW = (255, 255, 0)
-TEXT_COLOR_RELEASED = TEXT_COLOR_WHITE
-TEXT_COLOR_TIMER_COUNTDOWN = (173, 173, 173) # For timer when counting down
-TEXT_COLOR_FOOTNOTE = (204, 204, 204)      # For the new footnote
-
-# --- Padding ---
-PADDING = 25
-
-# --- Logo Scaling ---
-LOGO_SCALE_FACTOR = 0.50
-
-# --- File Paths (relative to this script) ---
+# Sizes, colors, fonts and the layout itself come from the theme; see themes.py
 _SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
-FONT_PATH = os.path.join(_SCRIPT_DIR, "assets/pixel-font.ttf")
-LOGO_PATH = os.path.join(_SCRIPT_DIR, "assets/logo.png")
-
-
-# --- Font Sizes ---
-FONT_SIZE_SUBTITLE = 30
-FONT_SIZE_DATE = 25
-FONT_SIZE_TIMER = 40
-FONT_SIZE_FOOTNOTE = 18
 
 # --- Hardcoded Footnote Text ---
 FOOTNOTE_TEXT_HARDCODED = "* June 5 in Japan, Australia, and New Zealand"
+SUBTITLE_TEXT = "Chapters 1-4"
+MIN_FONT_SCALE = 0.6  # Localized lines too wide for the image shrink down to this fraction of their size
 
 # --- Helper Function to Center Text within Padded Area ---
 def draw_text_centered_padded(draw, text, y, font, fill, image_width, padding):
@@ -63,147 +48,786 @@ def draw_text_centered_padded(draw, text, y, font, fill, image_width, padding):
         print(f"Error drawing text '{text}': {e}")
         return None
 
-# --- Main Image Creation ---
-def create_countdown_image(game_released=False, target_date_override=None):
+# --- Theme & Template Cache ---
+# The theme is compiled once into a draw plan (fonts and images loaded, static
+# positions worked out), and the static parts of each image (everything but
+# the timer) are drawn from it once per distinct text and reused. Both are
+# rebuilt when the theme or its files change on disk.
+_cache_lock = threading.Lock()
+# (theme version, game_released, date_text, timer_height, subtitle, footnote) -> (Image, timer_y), least recently used first
+_template_cache = OrderedDict()
+_template_cache_bytes = 0
+_template_versions = {}  # theme name -> version its cached templates were drawn with
+TEMPLATE_CACHE_BYTES = int(os.getenv('TEMPLATE_CACHE_BYTES', str(32 * 1024 * 1024)))  # Memory for cached templates
+
+
+def reset_caches():
+    """Drops the compiled themes, templates and glyph atlases (the next render is cold)."""
+    global _template_cache_bytes
+    THEMES.reset()
+    with _cache_lock:
+        _template_cache.clear()
+        _template_cache_bytes = 0
+        _template_versions.clear()
+
+
+def load_assets(theme=None):
     """
-    Creates countdown image with optional "Released!" state and a hardcoded JST footnote.
-    The displayed date in the image will be "June 4, YYYY" while the countdown
-    target remains based on target_date_override.
+    Returns the compiled draw plan for theme (default: COUNTDOWN_THEME),
+    compiling it on first use or whenever the theme's files have changed.
 
-    Args:
-        game_released (bool, optional): If True, displays "Released!"
-                                         instead of the countdown timer and hides footnote.
-                                         Defaults to False.
-        target_date_override (datetime.datetime, optional): The specific release date to count down to.
-                                                            Should be offset-aware for accurate countdown.
-                                                            If None, this function will not produce a valid countdown.
     Returns:
-        io.BytesIO or None: An io.BytesIO buffer containing the PNG image
-                            data, or None if an error occurs.
+        themes.DrawPlan or None: The plan, or None if the theme could not be loaded.
     """
-    if target_date_override is None:
-        print("Error: target_date_override is required for create_countdown_image.")
-        return None
-    
-    effective_target_date = target_date_override # This is June 5 JST for the *actual* countdown
-
-    if not os.path.exists(FONT_PATH):
-        print(f"Error: Font file not found at '{FONT_PATH}'. Ensure 'assets' folder is next to countdown.py.")
-        return None
-    if not os.path.exists(LOGO_PATH):
-        print(f"Error: Logo file not found at '{LOGO_PATH}'. Ensure 'assets' folder is next to countdown.py.")
-        return None
-
+    global _template_cache_bytes
     try:
-        logo_img_original = Image.open(LOGO_PATH)
-        original_width, original_height = logo_img_original.size
-        new_width = int(original_width * LOGO_SCALE_FACTOR)
-        new_height = int(original_height * LOGO_SCALE_FACTOR)
-        logo_img = logo_img_original.resize((new_width, new_height), Image.Resampling.NEAREST)
-
-        if logo_img.mode != 'RGBA':
-            # Attempt to convert to RGBA if it's palettized with transparency
-            if logo_img.mode == 'P' and 'transparency' in logo_img.info:
-                logo_img = logo_img.convert('RGBA')
-            elif logo_img.mode != 'RGB': # Convert other modes like 'L' or 'CMYK' to RGBA for consistency
-                 logo_img = logo_img.convert('RGBA')
-        logo_width, logo_height = logo_img.size
-    except Exception as e:
-        print(f"Error opening, resizing, or processing logo image '{LOGO_PATH}': {e}")
+        plan = get_plan(theme)
+    except ThemeError as e:
+        print(f"Error: {e}")
         return None
 
-    logo_x = (IMG_WIDTH - logo_width) // 2
-    logo_y = PADDING
+    with _cache_lock:
+        previous = _template_versions.get(plan.name)
+        if previous != plan.version:
+            # Templates drawn with an older version of this theme are never used again
+            if previous is not None:
+                for key in [key for key in _template_cache if key[0] == previous]:
+                    _template_cache_bytes -= _image_bytes(_template_cache.pop(key)[0])
+            _template_versions[plan.name] = plan.version
+    return plan
 
-    img = Image.new('RGB', (IMG_WIDTH, IMG_HEIGHT), color=BACKGROUND_COLOR)
+
+def _font_fitting(plan, step, text):
+    """
+    Returns the step's font, or a smaller size of it if text would be wider
+    than the padded image (down to MIN_FONT_SCALE of the original size).
+    """
+    font = step.font
+    available_width = plan.width - 2 * plan.padding
+    if font.getlength(text) <= available_width:
+        return font
+    size = font.size
+    while size > font.size * MIN_FONT_SCALE:
+        size -= 1
+        key = (step.font_path, size)
+        fitted = plan.fitted.get(key)
+        if fitted is None:
+            fitted = plan.fitted[key] = ImageFont.truetype(step.font_path, size)
+        if fitted.getlength(text) <= available_width:
+            return fitted
+    return fitted
+
+
+def _build_template(plan, game_released, release_date_display_text, timer_height,
+                    subtitle_text=SUBTITLE_TEXT, footnote_text=FOOTNOTE_TEXT_HARDCODED):
+    """Runs the plan's steps for everything except the timer. Returns (image, timer_y)."""
+    texts = {'subtitle': subtitle_text, 'date': release_date_display_text, 'footnote': footnote_text}
+    img = Image.new('RGB', (plan.width, plan.height), color=plan.background)
     draw = ImageDraw.Draw(img)
 
-    try:
-        font_subtitle = ImageFont.truetype(FONT_PATH, FONT_SIZE_SUBTITLE)
-        font_date = ImageFont.truetype(FONT_PATH, FONT_SIZE_DATE)
-        font_timer = ImageFont.truetype(FONT_PATH, FONT_SIZE_TIMER)
-        font_footnote = ImageFont.truetype(FONT_PATH, FONT_SIZE_FOOTNOTE)
-    except Exception as e:
-        print(f"An error occurred loading font variants: {e}")
-        return None
+    timer_y = None
+    current_y = plan.padding
+    for step in plan.steps:
+        if not step.visible(game_released):
+            continue
+        if step.y is not None:
+            current_y = step.y
+
+        if step.kind == 'timer':
+            timer_y = current_y
+            # The released text has no fixed height; leave room for the font size instead
+            current_y += (timer_height if timer_height is not None else step.size) + step.space_after
+        elif step.kind == 'image':
+            try:
+                if step.image.mode == 'RGBA':
+                    img.paste(step.image, (step.x, current_y), step.image) # Use the image's alpha channel as mask
+                else:
+                    img.paste(step.image, (step.x, current_y)) # No alpha mask needed or available
+            except Exception as e:
+                print(f"Error pasting image: {e}")
+            current_y += step.height + step.space_after
+        elif step.slot is None:
+            # Fixed text: already measured and centered when the theme was compiled
+            draw.text((step.x, current_y), step.text, font=step.font, fill=step.color)
+            current_y += step.height + step.space_after
+        else:
+            text = texts[step.slot]
+            bbox = draw_text_centered_padded(draw, text, current_y, _font_fitting(plan, step, text), step.color,
+                                             plan.width, plan.padding)
+            if bbox:
+                current_y = bbox[3] + step.space_after # Y-pos for next element is bottom of current + spacing
+            else:
+                current_y += step.size + step.space_after # Fallback if drawing fails
+
+    return img, timer_y
 
-    # MODIFICATION: Change display date to June 4, but keep year from actual target
-    # The year is derived from effective_target_date (which is June 5, 2025 JST)
-    # This makes the displayed date "June 4, 2025"
-    release_date_display_text = f"Releasing on June 4, {effective_target_date.strftime('%Y')}"
-    
-    timer_color_actual = TEXT_COLOR_TIMER_COUNTDOWN
 
+def get_template(plan, game_released, release_date_display_text, timer_height,
+                 subtitle_text=SUBTITLE_TEXT, footnote_text=FOOTNOTE_TEXT_HARDCODED):
+    """
+    Returns the cached (image, timer_y) template. The image must not be
+    modified; copy it first. Templates are evicted least recently used first
+    once they take up more than TEMPLATE_CACHE_BYTES.
+    """
+    global _template_cache_bytes
+    key = (plan.version, game_released, release_date_display_text, timer_height, subtitle_text, footnote_text)
+    with _cache_lock:
+        template = _template_cache.get(key)
+        if template is not None:
+            _template_cache.move_to_end(key)
+            return template
+    template = _build_template(plan, game_released, release_date_display_text, timer_height, subtitle_text, footnote_text)
+    with _cache_lock:
+        if key not in _template_cache:
+            _template_cache[key] = template
+            _template_cache_bytes += _image_bytes(template[0])
+            while _template_cache_bytes > TEMPLATE_CACHE_BYTES and len(_template_cache) > 1:
+                _, (evicted, _) = _template_cache.popitem(last=False)
+                _template_cache_bytes -= _image_bytes(evicted)
+    return template
+
+
+def _image_bytes(img):
+    return img.width * img.height * len(img.getbands())
+
+
+def get_timer_text(game_released, effective_target_date, now=None):
+    """
+    Returns the "DD : HH : MM : SS" timer string (or "Released!") for now,
+    which defaults to the current moment.
+    """
     if game_released:
-        timer_text = "Released!"
-        timer_color_actual = TEXT_COLOR_RELEASED
-    else:
+        return "Released!"
+
+    if now is None:
         # Countdown logic still uses the precise effective_target_date (June 5 JST)
         if effective_target_date.tzinfo is not None:
             now = datetime.datetime.now(effective_target_date.tzinfo)
         else:
             # This case should ideally not happen if target_date_override is always tz-aware
             print("Warning: effective_target_date is naive. Countdown might be inaccurate if a specific timezone was intended.")
-            now = datetime.datetime.now() 
-        
-        time_diff = effective_target_date - now
-
-        if time_diff.total_seconds() <= 0:
-            # Game is past release time according to target_date_override
-            days, hours, minutes, seconds = 0, 0, 0, 0
-            timer_text = f"{days:02d} : {hours:02d} : {minutes:02d} : {seconds:02d}"
+            now = datetime.datetime.now()
+
+    time_diff = effective_target_date - now
+
+    if time_diff.total_seconds() <= 0:
+        # Game is past release time according to target_date_override
+        days, hours, minutes, seconds = 0, 0, 0, 0
+    else:
+        days = time_diff.days
+        remaining_seconds = time_diff.seconds
+        hours = remaining_seconds // 3600
+        minutes = (remaining_seconds % 3600) // 60
+        seconds = remaining_seconds % 60
+    return f"{days:02d} : {hours:02d} : {minutes:02d} : {seconds:02d}"
+
+
+def get_timer_texts(effective_target_date, frame_count, now=None):
+    """Returns the timer strings for frame_count consecutive seconds starting at now."""
+    if now is None:
+        now = datetime.datetime.now(effective_target_date.tzinfo)
+    return [get_timer_text(False, effective_target_date, now + datetime.timedelta(seconds=i))
+            for i in range(frame_count)]
+
+
+def uses_default_date_wording(effective_target_date):
+    """
+    True for the Deltarune default release, which is announced by the date it
+    lands in the Americas and Europe (June 4) with the JST date in the footnote.
+    """
+    return effective_target_date == DEFAULT_RELEASE_DATE
+
+
+def get_release_date_display_text(effective_target_date):
+    if uses_default_date_wording(effective_target_date):
+        # MODIFICATION: Change display date to June 4, but keep year from actual target
+        # The year is derived from effective_target_date (which is June 5, 2025 JST)
+        # This makes the displayed date "June 4, 2025"
+        return f"Releasing on June 4, {effective_target_date.strftime('%Y')}"
+    # Other targets show their release date in their own time zone
+    return (f"Releasing on {effective_target_date.strftime('%B')} {effective_target_date.day}, "
+            f"{effective_target_date.year}")
+
+
+def get_release_footnote_text(effective_target_date):
+    """Returns the footnote under the timer: the JST date for the default release, else the release time."""
+    if uses_default_date_wording(effective_target_date):
+        return FOOTNOTE_TEXT_HARDCODED
+    release_time = effective_target_date.strftime('%I:%M %p').lstrip('0')
+    return f"* {release_time} {effective_target_date.strftime('%Z')}".rstrip()
+
+
+def _measure_text_height(font, text):
+    try:
+        bbox = font.getbbox(text)
+        return bbox[3] - bbox[1]
+    except Exception as e:
+        print(f"Error measuring text '{text}': {e}")
+        return None
+
+
+# --- Timer Glyph Atlas ---
+# The timer only ever uses these characters, so instead of a FreeType layout
+# and rasterization pass per render, each glyph is rasterized once (per
+# sub-pixel start offset) and the tiles are composited into the timer region.
+TIMER_GLYPHS = "0123456789 :"
+
+
+class TimerGlyphAtlas:
+    """
+    Pre-rendered glyph coverage masks for TIMER_GLYPHS, drawn in a single color.
+
+    Only usable for fonts where every glyph has an integer advance and there is
+    no kerning between glyph pairs; use TimerGlyphAtlas.supports(font) to check.
+    The masks are combined into one mask for the whole string and the fill is
+    pasted through it, so any background and text color work.
+    """
+
+    def __init__(self, font, fill):
+        self.font = font
+        self.fill = fill
+        self.advance = {c: int(font.getlength(c)) for c in TIMER_GLYPHS}
+        self.bbox = {c: font.getbbox(c) for c in TIMER_GLYPHS}
+        self._tiles = {}  # (frac_x, frac_y) -> {char: (Image, (dx, dy))}
+
+    @staticmethod
+    def supports(font):
+        try:
+            advances = {c: font.getlength(c) for c in TIMER_GLYPHS}
+            if any(a != int(a) for a in advances.values()):
+                return False
+            for a in TIMER_GLYPHS:
+                for b in TIMER_GLYPHS:
+                    if font.getlength(a + b) != advances[a] + advances[b]:
+                        return False
+            return True
+        except Exception as e:
+            print(f"Error inspecting timer font for glyph atlas: {e}")
+            return False
+
+    def can_render(self, text):
+        return all(c in self.advance for c in text)
+
+    def text_bbox(self, text):
+        """Same result as font.getbbox(text), computed from per-glyph metrics."""
+        left = top = right = bottom = None
+        pen = 0
+        for c in text:
+            gl, gt, gr, gb = self.bbox[c]
+            left = pen + gl if left is None else min(left, pen + gl)
+            top = gt if top is None else min(top, gt)
+            right = pen + gr if right is None else max(right, pen + gr)
+            bottom = gb if bottom is None else max(bottom, gb)
+            pen += self.advance[c]
+        if left is None:
+            return (0, 0, 0, 0)
+        return (left, top, right, bottom)
+
+    def _tiles_for(self, frac_x, frac_y):
+        key = (frac_x, frac_y)
+        tiles = self._tiles.get(key)
+        if tiles is None:
+            tiles = {}
+            for c in TIMER_GLYPHS:
+                gl, gt, gr, gb = self.bbox[c]
+                # One spare pixel on every side for the sub-pixel shift
+                dx = min(0, gl) - 1
+                dy = min(0, gt) - 1
+                width = max(gr, self.advance[c]) - dx + 2
+                height = gb - dy + 2
+                tile = Image.new('L', (width, height), color=0)
+                ImageDraw.Draw(tile).text((frac_x - dx, frac_y - dy), c, font=self.font, fill=255)
+                tiles[c] = (tile, (dx, dy))
+            self._tiles[key] = tiles
+        return tiles
+
+    def draw(self, img, xy, text):
+        """Composites text onto img at xy, pixel-identical to ImageDraw.text(xy, text, font, fill)."""
+        frac_x, int_x = math.modf(xy[0])
+        frac_y, int_y = math.modf(xy[1])
+        tiles = self._tiles_for(frac_x, frac_y)
+        pen = int(int_x)
+        y = int(int_y)
+        placed = []
+        for c in text:
+            tile, (dx, dy) = tiles[c]
+            placed.append((tile, pen + dx, y + dy))
+            pen += self.advance[c]
+        if not placed:
+            return
+        left = min(x for _, x, _ in placed)
+        top = min(y for _, _, y in placed)
+        right = max(x + tile.width for tile, x, _ in placed)
+        bottom = max(y + tile.height for tile, _, y in placed)
+
+        mask = Image.new('L', (right - left, bottom - top), color=0)
+        for tile, x, y in placed:
+            box = (x - left, y - top, x - left + tile.width, y - top + tile.height)
+            # Neighbouring tiles can overlap by a pixel; keep the highest
+            # coverage, like FreeType does when it renders the whole string.
+            mask.paste(ImageChops.lighter(mask.crop(box), tile), box)
+        img.paste(self.fill, (left, top, right, bottom), mask)
+
+
+def get_timer_atlas(plan, fill):
+    """Returns the plan's cached TimerGlyphAtlas for this fill color, or None if the timer font doesn't support one."""
+    font_timer = plan.timer.font
+    with _cache_lock:
+        atlases = plan.atlases
+        if fill not in atlases:
+            atlases[fill] = TimerGlyphAtlas(font_timer, fill) if TimerGlyphAtlas.supports(font_timer) else None
+        return atlases[fill]
+
+
+def draw_timer_with_atlas(img, atlas, text, y, image_width, padding):
+    """Atlas equivalent of draw_text_centered_padded for the timer. Returns the same bbox tuple."""
+    available_width = image_width - (2 * padding)
+    if available_width <= 0:
+        available_width = image_width
+
+    bbox = atlas.text_bbox(text)
+    text_width = bbox[2] - bbox[0]
+    text_height = bbox[3] - bbox[1]
+
+    inner_x = (available_width - text_width) / 2
+    x = padding + inner_x
+    x = max(padding, x) # Ensure text doesn't go outside left padding
+
+    atlas.draw(img, (x, y), text)
+    return (x, y, x + text_width, y + text_height)
+
+
+def warm_up(release_date=None, theme=None):
+    """
+    Compiles the theme and builds the glyph atlas and the templates for
+    release_date's texts (default: the Deltarune release) ahead of the first
+    render. Returns True if the theme loaded.
+    """
+    if load_assets(theme) is None:
+        return False
+    if release_date is None:
+        release_date = DEFAULT_RELEASE_DATE
+    release_date_display_text = get_release_date_display_text(release_date)
+    footnote_text = get_release_footnote_text(release_date)
+    render_countdown_image(False, "00 : 00 : 00 : 00", release_date_display_text, theme=theme, footnote_text=footnote_text)
+    render_countdown_image(True, "Released!", release_date_display_text, theme=theme, footnote_text=footnote_text)
+    return True
+
+
+# --- Output Formats ---
+# "png"         full-color RGB PNG (the original output)
+# "png-palette" 8-bit palette PNG; lossless since the image has well under 256 colors
+# "webp"        lossless WebP
+OUTPUT_FORMATS = ('png', 'png-palette', 'webp')
+OUTPUT_FORMAT = os.getenv('COUNTDOWN_IMAGE_FORMAT', 'png').lower()
+PNG_COMPRESS_LEVEL = int(os.getenv('PNG_COMPRESS_LEVEL', '6'))   # zlib level, 0-9
+PNG_ZLIB_STRATEGY = os.getenv('PNG_ZLIB_STRATEGY', 'default').lower()
+WEBP_METHOD = int(os.getenv('WEBP_METHOD', '4'))                 # 0 (fast) - 6 (small)
+
+PNG_ZLIB_STRATEGIES = {
+    'default': zlib.Z_DEFAULT_STRATEGY,
+    'filtered': zlib.Z_FILTERED,
+    'huffman': zlib.Z_HUFFMAN_ONLY,
+    'rle': zlib.Z_RLE,
+    'fixed': zlib.Z_FIXED,
+}
+
+FORMAT_EXTENSIONS = {'png': 'png', 'png-palette': 'png', 'webp': 'webp'}
+
+
+def resolve_output_format(output_format=None):
+    """Returns output_format (or the configured default) if valid, otherwise "png"."""
+    output_format = (output_format or OUTPUT_FORMAT).lower()
+    if output_format not in OUTPUT_FORMATS:
+        print(f"Warning: unknown image format '{output_format}', using png.")
+        return 'png'
+    return output_format
+
+
+def image_filename(basename, output_format=None):
+    return f"{basename}.{FORMAT_EXTENSIONS[resolve_output_format(output_format)]}"
+
+
+def to_palette_image(img):
+    """
+    Converts an RGB image to mode 'P' with an adaptive palette. With at most
+    256 distinct colors median cut gives each color its own palette entry, so
+    the conversion is lossless.
+    """
+    colors = img.getcolors(256)
+    palette_size = len(colors) if colors is not None else 256
+    return img.quantize(colors=palette_size, method=Image.Quantize.MEDIANCUT, dither=Image.Dither.NONE)
+
+
+def encode_image(img, output_format=None, compress_level=None, zlib_strategy=None):
+    """
+    Encodes a rendered image.
+
+    Args:
+        img (PIL.Image.Image): The RGB image to encode.
+        output_format (str, optional): One of OUTPUT_FORMATS. Defaults to COUNTDOWN_IMAGE_FORMAT.
+        compress_level (int, optional): zlib level for PNG output. Defaults to PNG_COMPRESS_LEVEL.
+        zlib_strategy (str, optional): Key of PNG_ZLIB_STRATEGIES. Defaults to PNG_ZLIB_STRATEGY.
+    Returns:
+        bytes: The encoded image.
+    """
+    output_format = resolve_output_format(output_format)
+    buffer = io.BytesIO()
+
+    if output_format == 'webp':
+        img.save(buffer, format='WEBP', lossless=True, method=WEBP_METHOD)
+        return buffer.getvalue()
+
+    if compress_level is None:
+        compress_level = PNG_COMPRESS_LEVEL
+    strategy = PNG_ZLIB_STRATEGIES.get((zlib_strategy or PNG_ZLIB_STRATEGY).lower(), zlib.Z_DEFAULT_STRATEGY)
+    if output_format == 'png-palette':
+        img = to_palette_image(img)
+    img.save(buffer, format='PNG', compress_level=compress_level, compress_type=strategy)
+    return buffer.getvalue()
+
+
+def compare_output_formats(img, repeats=20):
+    """
+    Encodes img with each format and a few PNG settings, returning a list of
+    {'format', 'compress_level', 'zlib_strategy', 'bytes', 'encode_ms'} dicts
+    sorted by size.
+    """
+    options = [('webp', None, None)]
+    for output_format in ('png', 'png-palette'):
+        for compress_level in (1, 6, 9):
+            for zlib_strategy in ('default', 'filtered', 'rle'):
+                options.append((output_format, compress_level, zlib_strategy))
+
+    report = []
+    for output_format, compress_level, zlib_strategy in options:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            data = encode_image(img, output_format, compress_level, zlib_strategy)
+        elapsed = (time.perf_counter() - start) / repeats
+        report.append({
+            'format': output_format,
+            'compress_level': compress_level,
+            'zlib_strategy': zlib_strategy,
+            'bytes': len(data),
+            'encode_ms': round(elapsed * 1000, 3),
+        })
+    report.sort(key=lambda row: row['bytes'])
+    return report
+
+
+# --- Animated Countdown ---
+# A ticking countdown: one frame per second. Frames share the template and only
+# the timer band is redrawn between them; the GIF/APNG encoders then store just
+# the region that changed from the previous frame.
+ANIMATION_FORMATS = ('gif', 'apng')
+ANIMATION_FORMAT = os.getenv('COUNTDOWN_ANIMATION_FORMAT', 'gif').lower()
+ANIMATION_FRAMES = int(os.getenv('COUNTDOWN_ANIMATION_FRAMES', '10'))
+ANIMATION_MAX_FRAMES = 60
+ANIMATION_FRAME_MS = 1000
+ANIMATION_EXTENSIONS = {'gif': 'gif', 'apng': 'png'}
+TIMER_BAND_MARGIN = 2  # Extra rows above/below the timer glyphs that get redrawn
+
+
+def resolve_animation_format(animation_format=None):
+    """Returns animation_format (or the configured default) if valid, otherwise "gif"."""
+    animation_format = (animation_format or ANIMATION_FORMAT).lower()
+    if animation_format not in ANIMATION_FORMATS:
+        print(f"Warning: unknown animation format '{animation_format}', using gif.")
+        return 'gif'
+    return animation_format
+
+
+def animation_filename(basename, animation_format=None):
+    return f"{basename}.{ANIMATION_EXTENSIONS[resolve_animation_format(animation_format)]}"
+
+
+def render_timer_bands(timer_texts, release_date_display_text,
+                       subtitle_text=SUBTITLE_TEXT, footnote_text=FOOTNOTE_TEXT_HARDCODED, theme=None):
+    """
+    Renders the countdown timer for each string into a strip covering just the
+    timer band, redrawing only when the text changes between frames.
+
+    All timer strings are expected to have the same rendered height (true for
+    the all-digit "DD : HH : MM : SS" timers), so they share one template.
+
+    Returns:
+        tuple or None: (template, band_box, bands) where template is the shared
+                       base image (do not modify), band_box is the (left, top,
+                       right, bottom) box the bands belong at, and bands has one
+                       RGB image per timer string. None if an error occurs.
+    """
+    if not timer_texts:
+        return None
+    plan = load_assets(theme)
+    if plan is None:
+        return None
+
+    font_timer = plan.timer.font
+    atlas = get_timer_atlas(plan, plan.timer.color)
+    if atlas is not None and not all(atlas.can_render(text) for text in timer_texts):
+        atlas = None
+
+    if atlas is not None:
+        timer_bbox = atlas.text_bbox(timer_texts[0])
+    else:
+        timer_bbox = font_timer.getbbox(timer_texts[0])
+    timer_height = timer_bbox[3] - timer_bbox[1]
+    template, timer_y = get_template(plan, False, release_date_display_text, timer_height, subtitle_text, footnote_text)
+
+    band_top = max(0, timer_y + min(0, timer_bbox[1]) - TIMER_BAND_MARGIN)
+    band_bottom = min(plan.height, timer_y + timer_bbox[3] + TIMER_BAND_MARGIN)
+    band_box = (0, band_top, plan.width, band_bottom)
+
+    clean_band = template.crop(band_box)
+    work = clean_band.copy()
+    draw = ImageDraw.Draw(work)
+    y = timer_y - band_top
+
+    bands = []
+    previous_text = None
+    for text in timer_texts:
+        if text != previous_text:
+            work.paste(clean_band, (0, 0))
+            if atlas is not None:
+                draw_timer_with_atlas(work, atlas, text, y, plan.width, plan.padding)
+            else:
+                draw_text_centered_padded(draw, text, y, font_timer, plan.timer.color, plan.width, plan.padding)
+            previous_text = text
+            bands.append(work.copy())
         else:
-            days = time_diff.days
-            remaining_seconds = time_diff.seconds
-            hours = remaining_seconds // 3600
-            minutes = (remaining_seconds % 3600) // 60
-            seconds = remaining_seconds % 60
-            timer_text = f"{days:02d} : {hours:02d} : {minutes:02d} : {seconds:02d}"
+            bands.append(bands[-1])
+    return template, band_box, bands
+
+
+def _palette_frames(template, band_box, bands):
+    """
+    Converts the frames to mode 'P' with one shared palette. The template and
+    every band are stacked into a single sheet and quantized together, which is
+    lossless (under 256 colors) and far cheaper than quantizing every frame.
+    """
+    width, height = template.size
+    band_width = band_box[2] - band_box[0]
+    band_height = band_box[3] - band_box[1]
+    sheet = Image.new('RGB', (width, height + band_height * len(bands)))
+    sheet.paste(template, (0, 0))
+    for i, band in enumerate(bands):
+        sheet.paste(band, (0, height + i * band_height))
+    sheet = to_palette_image(sheet)
+
+    base = sheet.crop((0, 0, width, height))
+    frames = []
+    for i in range(len(bands)):
+        top = height + i * band_height
+        frame = base.copy()
+        frame.paste(sheet.crop((0, top, band_width, top + band_height)), band_box[:2])
+        frames.append(frame)
+    return frames
+
+
+def render_countdown_animation(timer_texts, release_date_display_text, animation_format=None,
+                               subtitle_text=SUBTITLE_TEXT, footnote_text=FOOTNOTE_TEXT_HARDCODED, theme=None):
+    """
+    Renders an animated countdown with one frame per timer string, shown for
+    ANIMATION_FRAME_MS each and played once.
+
+    Args:
+        timer_texts (list[str]): Timer strings, one per frame (see get_timer_texts).
+        release_date_display_text (str): The date line shown under the subtitle.
+        animation_format (str, optional): "gif" or "apng". Defaults to COUNTDOWN_ANIMATION_FORMAT.
+        subtitle_text, footnote_text (str, optional): Localized template lines.
+        theme (str, optional): Theme name. Defaults to COUNTDOWN_THEME.
+    Returns:
+        bytes or None: The encoded animation, or None if an error occurs.
+    """
+    animation_format = resolve_animation_format(animation_format)
+    rendered = render_timer_bands(timer_texts[:ANIMATION_MAX_FRAMES], release_date_display_text, subtitle_text, footnote_text,
+                                  theme)
+    if rendered is None:
+        return None
+    template, band_box, bands = rendered
 
     try:
-        paste_position = (logo_x, logo_y)
-        if logo_img.mode == 'RGBA':
-            img.paste(logo_img, paste_position, logo_img) # Use logo's alpha channel as mask
+        buffer = io.BytesIO()
+        if animation_format == 'gif':
+            frames = _palette_frames(template, band_box, bands)
+            # No loop count: a countdown shouldn't jump back in time. Passing the
+            # shared palette keeps per-frame color tables out of the file, and
+            # the encoder still crops each frame to what changed.
+            frames[0].save(buffer, format='GIF', save_all=True, append_images=frames[1:],
+                           duration=ANIMATION_FRAME_MS, palette=frames[0].palette, optimize=False)
         else:
-             img.paste(logo_img, paste_position) # No alpha mask needed or available
+            frames = []
+            for band in bands:
+                frame = template.copy()
+                frame.paste(band, band_box[:2])
+                frames.append(frame)
+            frames[0].save(buffer, format='PNG', save_all=True, append_images=frames[1:],
+                           duration=ANIMATION_FRAME_MS, loop=1,
+                           compress_level=PNG_COMPRESS_LEVEL)
+        return buffer.getvalue()
     except Exception as e:
-        print(f"Error pasting logo: {e}")
+        print(f"Error encoding countdown animation: {e}")
+        return None
 
-    current_y = logo_y + logo_height + 20 # Start Y-position below the logo
 
-    subtitle_bbox = draw_text_centered_padded(draw, "Chapters 1-4", current_y, font_subtitle, TEXT_COLOR_WHITE, IMG_WIDTH, PADDING)
-    if subtitle_bbox:
-        current_y = subtitle_bbox[3] + 45 # Y-pos for next element is bottom of current + spacing
-    else:
-        current_y += FONT_SIZE_SUBTITLE + 45 # Fallback if drawing fails
+def compare_animation_cost(effective_target_date, frame_counts=(10, 60), animation_formats=ANIMATION_FORMATS):
+    """
+    Times render_countdown_animation against frame_count separate
+    create_countdown_image calls. Returns a list of dicts, one per
+    (frame_count, format), with 'ms' and 'bytes' for both approaches.
+    """
+    report = []
+    release_date_display_text = get_release_date_display_text(effective_target_date)
+    for frame_count in frame_counts:
+        start = time.perf_counter()
+        separate_bytes = 0
+        for _ in range(frame_count):
+            buffer = create_countdown_image(False, effective_target_date, 'png')
+            separate_bytes += len(buffer.getvalue()) if buffer else 0
+        separate_ms = (time.perf_counter() - start) * 1000
+
+        timer_texts = get_timer_texts(effective_target_date, frame_count)
+        for animation_format in animation_formats:
+            start = time.perf_counter()
+            data = render_countdown_animation(timer_texts, release_date_display_text, animation_format,
+                                              footnote_text=get_release_footnote_text(effective_target_date))
+            report.append({
+                'frames': frame_count,
+                'format': animation_format,
+                'ms': round((time.perf_counter() - start) * 1000, 1),
+                'bytes': len(data) if data else 0,
+                'separate_png_ms': round(separate_ms, 1),
+                'separate_png_bytes': separate_bytes,
+            })
+    return report
+
 
-    date_bbox = draw_text_centered_padded(draw, release_date_display_text, current_y, font_date, TEXT_COLOR_YELLOW, IMG_WIDTH, PADDING)
-    if date_bbox:
-        current_y = date_bbox[3] + 25
+# --- Main Image Creation ---
+
+def render_countdown_image(game_released, timer_text, release_date_display_text, use_atlas=True,
+                           subtitle_text=SUBTITLE_TEXT, footnote_text=FOOTNOTE_TEXT_HARDCODED, theme=None):
+    """
+    Renders the image for an already-computed timer string onto a copy of the
+    cached template for theme. The countdown timer is composited from the glyph
+    atlas unless use_atlas is False (or the font can't use one), in which case
+    it is drawn with FreeType. Returns a PIL Image, or None if an error occurs.
+    """
+    plan = load_assets(theme)
+    if plan is None:
+        return None
+
+    font_timer = plan.timer.font
+    timer_color_actual = plan.timer.released_color if game_released else plan.timer.color
+
+    atlas = None
+    if use_atlas and not game_released:
+        atlas = get_timer_atlas(plan, timer_color_actual)
+        if atlas is not None and not atlas.can_render(timer_text):
+            atlas = None
+
+    if game_released:
+        timer_height = None
+    elif atlas is not None:
+        timer_bbox = atlas.text_bbox(timer_text)
+        timer_height = timer_bbox[3] - timer_bbox[1]
     else:
-        current_y += FONT_SIZE_DATE + 25
+        timer_height = _measure_text_height(font_timer, timer_text)
+    template, timer_y = get_template(plan, game_released, release_date_display_text, timer_height, subtitle_text, footnote_text)
 
-    timer_bbox = draw_text_centered_padded(draw, timer_text, current_y, font_timer, timer_color_actual, IMG_WIDTH, PADDING)
-    if timer_bbox:
-        current_y = timer_bbox[3] + 25 # Increased spacing after timer
+    img = template.copy()
+    if atlas is not None:
+        draw_timer_with_atlas(img, atlas, timer_text, timer_y, plan.width, plan.padding)
     else:
-        current_y += FONT_SIZE_TIMER + 25 # Increased spacing
-    
-    # Only draw footnote if game is not released
-    if not game_released:
-        footnote_bbox = draw_text_centered_padded(draw, FOOTNOTE_TEXT_HARDCODED, current_y, font_footnote, TEXT_COLOR_FOOTNOTE, IMG_WIDTH, PADDING)
-        # if footnote_bbox:
-        #     current_y = footnote_bbox[3] + PADDING # Update if more elements were below
+        if game_released:
+            # The released text may be localized and longer than "Released!"
+            font_timer = _font_fitting(plan, plan.timer, timer_text)
+        draw = ImageDraw.Draw(img)
+        draw_text_centered_padded(draw, timer_text, timer_y, font_timer, timer_color_actual, plan.width, plan.padding)
+    return img
+
+
+def render_countdown_bytes(game_released, timer_text, release_date_display_text, output_format=None,
+                           subtitle_text=SUBTITLE_TEXT, footnote_text=FOOTNOTE_TEXT_HARDCODED, theme=None):
+    """
+    Renders and encodes the image for an already-computed timer string, with
+    optionally localized subtitle and footnote lines, in the given theme
+    (default: COUNTDOWN_THEME).
+
+    Returns:
+        bytes or None: The encoded image (see encode_image), or None if an error occurs.
+    """
+    img = render_countdown_image(game_released, timer_text, release_date_display_text,
+                                 subtitle_text=subtitle_text, footnote_text=footnote_text, theme=theme)
+    if img is None:
+        return None
 
     try:
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        buffer.seek(0)
-        return buffer
+        return encode_image(img, output_format)
     except Exception as e:
         print(f"Error saving image to buffer: {e}")
         return None
 
+
+def create_countdown_image(game_released=False, target_date_override=None, output_format=None):
+    """
+    Creates countdown image with optional "Released!" state and a release footnote.
+    For the Deltarune default the displayed date in the image will be "June 4, YYYY"
+    while the countdown target remains based on target_date_override.
+
+    Args:
+        game_released (bool, optional): If True, displays "Released!"
+                                         instead of the countdown timer and hides footnote.
+                                         Defaults to False.
+        target_date_override (datetime.datetime, optional): The specific release date to count down to.
+                                                            Should be offset-aware for accurate countdown.
+                                                            If None, this function will not produce a valid countdown.
+        output_format (str, optional): One of OUTPUT_FORMATS. Defaults to the
+                                       COUNTDOWN_IMAGE_FORMAT environment variable, or "png".
+    Returns:
+        io.BytesIO or None: An io.BytesIO buffer containing the encoded image
+                            data, or None if an error occurs.
+    """
+    if target_date_override is None:
+        print("Error: target_date_override is required for create_countdown_image.")
+        return None
+    
+    effective_target_date = target_date_override # This is June 5 JST for the *actual* countdown
+
+    timer_text = get_timer_text(game_released, effective_target_date)
+    image_bytes = render_countdown_bytes(game_released, timer_text, get_release_date_display_text(effective_target_date), output_format,
+                                         footnote_text=get_release_footnote_text(effective_target_date))
+    if image_bytes is None:
+        return None
+
+    buffer = io.BytesIO(image_bytes)
+    buffer.seek(0)
+    return buffer
+
+
+def verify_timer_atlas(timer_texts=None, theme_names=None):
+    """
+    Checks that atlas-rendered timers are pixel-identical to FreeType-rendered
+    ones in every theme (or just theme_names). Returns a list of the
+    "theme: timer" strings that differ (empty if all match).
+    """
+    if timer_texts is None:
+        timer_texts = [
+            "00 : 00 : 00 : 00", "01 : 02 : 03 : 04", "12 : 03 : 07 : 41",
+            "56 : 78 : 90 : 12", "99 : 23 : 59 : 59", "123 : 23 : 59 : 59",
+            "365 : 11 : 11 : 11",
+        ]
+    release_date_display_text = "Releasing on June 4, 2025"
+    mismatches = []
+    for theme in (theme_names if theme_names is not None else THEMES.names()):
+        for timer_text in timer_texts:
+            fast = render_countdown_image(False, timer_text, release_date_display_text, use_atlas=True, theme=theme)
+            slow = render_countdown_image(False, timer_text, release_date_display_text, use_atlas=False, theme=theme)
+            if fast is None or slow is None or ImageChops.difference(fast, slow).getbbox() is not None:
+                mismatches.append(f"{theme}: {timer_text}")
+    return mismatches
+
+
 if __name__ == "__main__":
     import pytz # Import for testing with aware datetimes
     JST = pytz.timezone('Asia/Tokyo')
@@ -216,7 +840,33 @@ if __name__ == "__main__":
         print(f"Warning: 'assets' directory not found at {os.path.join(_SCRIPT_DIR, 'assets')}")
         print("Please create it and add 'pixel-font.ttf' and 'logo.png' for local testing.")
     else:
-        print("\nGenerating countdown image (simulating 'not released' with June 4 display date)...")
+        print("\nVerifying glyph-atlas timer against FreeType rendering...")
+        atlas_mismatches = verify_timer_atlas()
+        if atlas_mismatches:
+            print(f"Glyph atlas output differs for: {atlas_mismatches}")
+        else:
+            print("Glyph atlas output is pixel-identical.")
+
+        print("-" * 20)
+
+        print("Output format report (smallest first):")
+        sample_img = render_countdown_image(False, "12 : 03 : 07 : 41", get_release_date_display_text(actual_release_date_for_testing))
+        if sample_img is not None:
+            for row in compare_output_formats(sample_img):
+                print(f"  {row['format']:<12} level={row['compress_level']!s:<5} strategy={row['zlib_strategy']!s:<9} "
+                      f"{row['bytes']:>7} bytes  {row['encode_ms']:>7.3f} ms")
+
+        print("-" * 20)
+
+        print("Animated countdown vs separate create_countdown_image calls:")
+        benchmark_target = datetime.datetime.now(JST) + datetime.timedelta(days=3, hours=5)
+        for row in compare_animation_cost(benchmark_target):
+            print(f"  {row['frames']:>3} frames {row['format']:<5} {row['ms']:>8.1f} ms {row['bytes']:>8} bytes   "
+                  f"(separate PNGs: {row['separate_png_ms']:>8.1f} ms {row['separate_png_bytes']:>8} bytes)")
+
+        print("-" * 20)
+
+        print("Generating countdown image (simulating 'not released' with June 4 display date)...")
         image_buffer_countdown = create_countdown_image(
             game_released=False,
             target_date_override=actual_release_date_for_testing 
@@ -0,0 +1,248 @@
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+
+from countdown import (SUBTITLE_TEXT, get_release_date_display_text, get_release_footnote_text, get_timer_text,
+                       render_countdown_bytes, resolve_output_format)
+from themes import theme_version
+
+# --- Configuration ---
+FRAME_CACHE_DIR = os.getenv('FRAME_CACHE_DIR', 'frame_cache')
+FRAME_CACHE_MINUTES = float(os.getenv('FRAME_CACHE_MINUTES', '0'))   # Minutes pre-rendered ahead; 0 disables the bot's pre-renderer
+FRAME_CACHE_REFILL = float(os.getenv('FRAME_CACHE_REFILL', '30'))    # Seconds between pre-render passes
+FRAME_CACHE_GRACE = 2.0  # Seconds a frame outlives its second, for requests already holding its key
+
+INDEX_FILE = 'index.json'
+
+
+def frame_key(game_released, timer_text, release_date_display_text, output_format, subtitle_text, footnote_text,
+              version=None):
+    """The cache key of a still image; the same fields the image is rendered from, plus its theme's version."""
+    return json.dumps([bool(game_released), timer_text, release_date_display_text, output_format,
+                       subtitle_text, footnote_text, version])
+
+
+class FrameCache:
+    """
+    Pre-rendered countdown images on disk. Image bytes are stored once per
+    content hash under objects/, and an index maps each frame key to its hash
+    and to the time the frame stops being shown (None for frames that never
+    expire, like the released image). The index is saved to index.json so a
+    cache warmed by the CLI is picked up by the bot.
+
+    Frames are served as open files, which are uploaded straight from disk
+    without reading them into memory first.
+    """
+
+    def __init__(self, directory=FRAME_CACHE_DIR):
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, 'objects')
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._index = {}    # key -> (digest, expires_at)
+        self._refs = {}     # digest -> number of keys using it
+        self.hits = 0
+        self.misses = 0
+        self._load_index()
+
+    def __len__(self):
+        return len(self._index)
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest)
+
+    def _load_index(self):
+        path = os.path.join(self.directory, INDEX_FILE)
+        try:
+            with open(path, 'r') as f:
+                entries = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Error reading frame cache index '{path}': {e}. Starting empty.")
+            return
+        for key, (digest, expires_at) in entries.items():
+            if os.path.exists(self._object_path(digest)):
+                self._add(key, digest, expires_at)
+
+    def save_index(self):
+        path = os.path.join(self.directory, INDEX_FILE)
+        with self._lock:
+            entries = {key: list(entry) for key, entry in self._index.items()}
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, path)
+
+    def _add(self, key, digest, expires_at):
+        previous = self._index.get(key)
+        self._index[key] = (digest, expires_at)
+        self._refs[digest] = self._refs.get(digest, 0) + 1
+        if previous is not None:
+            self._release(previous[0])
+
+    def _release(self, digest):
+        self._refs[digest] -= 1
+        if self._refs[digest] > 0:
+            return
+        del self._refs[digest]
+        try:
+            os.remove(self._object_path(digest))
+        except OSError:
+            pass  # Already gone, or still open elsewhere on platforms that forbid deleting it
+
+    def __contains__(self, key):
+        return key in self._index
+
+    def put(self, key, data, expires_at=None):
+        """Stores data for key. expires_at is a Unix timestamp, or None for frames that never expire."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        with self._lock:
+            self._add(key, digest, expires_at)
+
+    def open(self, key, now=None):
+        """Returns the frame for key as an open binary file, or None if it isn't cached (or has expired)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None or (entry[1] is not None and entry[1] + FRAME_CACHE_GRACE < now):
+                self.misses += 1
+                return None
+            try:
+                # Opened under the lock, so eviction can't remove the file in between
+                fp = open(self._object_path(entry[0]), 'rb')
+            except OSError:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return fp
+
+    def evict_expired(self, now=None):
+        """Drops every frame whose second has passed. Returns the number of frames dropped."""
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [key for key, (_, expires_at) in self._index.items()
+                       if expires_at is not None and expires_at + FRAME_CACHE_GRACE < now]
+            for key in expired:
+                digest, _ = self._index.pop(key)
+                self._release(digest)
+        return len(expired)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'frames': len(self._index),
+                'objects': len(self._refs),
+            }
+
+
+def plan_frames(release_date, minutes, output_format=None, now=None, theme=None):
+    """
+    Lists the still images to have ready for the next minutes: one per second
+    of countdown, the all-zero timer shown after the release time, and the
+    released image.
+
+    Returns:
+        list: (key, render_countdown_bytes args, expires_at) tuples. Empty if
+              the theme can't be loaded.
+    """
+    output_format = resolve_output_format(output_format)
+    version = theme_version(theme)
+    if version is None:
+        return []
+    now = datetime.datetime.now(release_date.tzinfo) if now is None else now
+    now = now.replace(microsecond=0)
+    date_text = get_release_date_display_text(release_date)
+    footnote_text = get_release_footnote_text(release_date)
+    release_ts = release_date.timestamp()
+
+    frames = {}
+    for i in range(int(minutes * 60) + 1):
+        moment = now + datetime.timedelta(seconds=i)
+        remaining = int((release_date - moment).total_seconds())
+        if remaining <= 0:
+            break
+        timer_text = get_timer_text(False, release_date, moment)
+        # Shown until the remaining time drops below `remaining` seconds
+        frames[frame_key(False, timer_text, date_text, output_format, SUBTITLE_TEXT, footnote_text, version)] = (
+            (False, timer_text, date_text, output_format, SUBTITLE_TEXT, footnote_text, theme),
+            release_ts - remaining)
+
+    # These two are shown for as long as it takes Steam to confirm the release
+    for released in (False, True):
+        timer_text = get_timer_text(released, release_date, release_date)
+        frames[frame_key(released, timer_text, date_text, output_format, SUBTITLE_TEXT, footnote_text, version)] = (
+            (released, timer_text, date_text, output_format, SUBTITLE_TEXT, footnote_text, theme), None)
+    return [(key, args, expires_at) for key, (args, expires_at) in frames.items()]
+
+
+def warm(cache, release_date, minutes, output_format=None, now=None, theme=None):
+    """Renders every planned frame that isn't cached yet and saves the index. Returns the number rendered."""
+    rendered = 0
+    for key, args, expires_at in plan_frames(release_date, minutes, output_format, now, theme):
+        if key in cache:
+            continue
+        data = render_countdown_bytes(*args)
+        if data is not None:
+            cache.put(key, data, expires_at)
+            rendered += 1
+    cache.evict_expired()
+    cache.save_index()
+    return rendered
+
+
+async def warm_async(cache, release_date, minutes, run, output_format=None, now=None, theme=None):
+    """
+    Like warm, but renders through run (e.g. RenderPool.run) one frame at a
+    time so pre-rendering never takes more than one worker, and does the disk
+    writes off the event loop.
+    """
+    import asyncio
+
+    rendered = 0
+    # Planning loads the theme, which may recompile it, so that's off the loop too
+    planned = await asyncio.to_thread(plan_frames, release_date, minutes, output_format, now, theme)
+    for key, args, expires_at in planned:
+        if key in cache:
+            continue
+        data = await run(render_countdown_bytes, *args)
+        if data is not None:
+            await asyncio.to_thread(cache.put, key, data, expires_at)
+            rendered += 1
+    await asyncio.to_thread(cache.evict_expired)
+    await asyncio.to_thread(cache.save_index)
+    return rendered
+
+
+if __name__ == "__main__":
+    from targets import load_targets
+
+    parser = argparse.ArgumentParser(description="Pre-render countdown images into the frame cache.")
+    parser.add_argument('--minutes', type=float, default=FRAME_CACHE_MINUTES or 10,
+                        help="How many minutes ahead to render (default: FRAME_CACHE_MINUTES, or 10)")
+    parser.add_argument('--format', dest='output_format', default=None,
+                        help="Output format (default: COUNTDOWN_IMAGE_FORMAT)")
+    parser.add_argument('--dir', dest='directory', default=FRAME_CACHE_DIR, help="Cache directory")
+    parser.add_argument('--target', action='append', help="Only warm these target keys (default: all)")
+    args = parser.parse_args()
+
+    cache = FrameCache(args.directory)
+    for target in load_targets(fallback_channel_id=0).values():
+        if args.target and target.key not in args.target:
+            continue
+        start = time.perf_counter()
+        rendered = warm(cache, target.release_date, args.minutes, args.output_format, theme=target.theme)
+        print(f"{target.key}: rendered {rendered} frame(s) in {time.perf_counter() - start:.1f}s")
+    print(f"Frame cache in {args.directory}: {cache.stats()}")
@@ -0,0 +1,418 @@
+"""
+Offline load test for the bot's request and release paths.
+
+Runs the real countdown_command, update_countdown and check_steam_status
+against stand-ins: fake interactions and a fake channel that record every
+outbound Discord call (with configurable latency), and a local aiohttp stub
+of Steam's appdetails endpoint that can flip coming_soon, return errors or
+add delay. With --embed, images go to a fake cache channel that hands back
+synthetic attachment URLs. --announce-channels and --announce-webhooks fan
+the release announcement out to extra fake channels and to webhooks on a
+local stub, which can answer each webhook's first post with a 429. Nothing
+talks to Discord or Steam.
+
+Three phases run in order: a burst of concurrent /countdown calls before
+release, the release transition (Steam flips, the poller announces), and a
+burst after release. Prints a JSON report of throughput, tail latency and
+outbound call counts per phase:
+
+    python loadtest.py --invocations 5000 --discord-latency 50 --output load.json
+"""
+import argparse
+import asyncio
+import collections
+import contextlib
+import datetime
+import io
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from aiohttp import web
+
+# The bot reads these at import time; point everything at throwaway local state
+_STATE_DIR = tempfile.mkdtemp(prefix='countdown-loadtest-')
+os.environ.setdefault('DISCORD_TOKEN', 'loadtest')
+os.environ['COUNTDOWN_CHANNEL_ID'] = '1000'
+os.environ['COUNTDOWN_TARGETS_FILE'] = os.path.join(_STATE_DIR, 'no-targets.json')
+os.environ['STATE_DB'] = os.path.join(_STATE_DIR, 'state.db')
+os.environ['FRAME_CACHE_MINUTES'] = '0'
+os.environ['FRAME_CACHE_DIR'] = os.path.join(_STATE_DIR, 'frame_cache')
+os.environ['METRICS_PORT'] = '0'
+
+import bot  # noqa: E402
+from attachment_cache import AttachmentCache  # noqa: E402
+from state_store import StateStore  # noqa: E402
+from steam import create_http_session  # noqa: E402
+
+
+def _percentile(samples, fraction):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# --- Discord stand-ins ---
+
+class CallLog:
+    """Counts outbound Discord calls by kind."""
+
+    def __init__(self):
+        self.calls = collections.Counter()
+
+    def snapshot(self):
+        return dict(self.calls)
+
+
+class FakeResponse:
+    def __init__(self, log, latency):
+        self._log = log
+        self._latency = latency
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def defer(self, **kwargs):
+        self._log.calls['defer'] += 1
+        await asyncio.sleep(self._latency)
+        self._done = True
+
+    async def send_message(self, content=None, **kwargs):
+        self._log.calls['response'] += 1
+        await asyncio.sleep(self._latency)
+        self._done = True
+
+
+class FakeFollowup:
+    def __init__(self, log, latency, interaction):
+        self._log = log
+        self._latency = latency
+        self._interaction = interaction
+
+    async def send(self, content=None, file=None, ephemeral=False, embed=None, **kwargs):
+        self._log.calls['followup'] += 1
+        if embed is not None:
+            self._log.calls['embed_reply'] += 1
+        if file is not None:
+            # Read the upload like discord.py would, then release it
+            self._log.calls['upload_bytes'] += len(file.fp.read())
+            file.close()
+        if ephemeral:
+            self._interaction.error = content
+        await asyncio.sleep(self._latency)
+
+
+class FakeInteraction:
+    """Just enough of discord.Interaction for countdown_command."""
+
+    def __init__(self, log, latency, guild_id=None):
+        self.guild_id = guild_id
+        self.user = None
+        self.error = None  # Ephemeral reply text, if the command answered with an error
+        self.response = FakeResponse(log, latency)
+        self.followup = FakeFollowup(log, latency, self)
+
+
+class FakeChannel:
+    """A countdown channel that records renames and messages."""
+
+    def __init__(self, log, latency, channel_id, name="deltarune"):
+        self.id = channel_id
+        self.name = name
+        self._log = log
+        self._latency = latency
+        self.messages = []
+
+    async def edit(self, name=None, **kwargs):
+        self._log.calls['channel_edit'] += 1
+        await asyncio.sleep(self._latency)
+        if name is not None:
+            self.name = name
+
+    async def send(self, content=None, **kwargs):
+        self._log.calls['channel_send'] += 1
+        await asyncio.sleep(self._latency)
+        self.messages.append(content)
+
+
+class FakeCacheChannel:
+    """An image cache channel whose uploads come back with synthetic, signed-looking attachment URLs."""
+
+    def __init__(self, log, latency, url_lifetime=86400):
+        self._log = log
+        self._latency = latency
+        self._url_lifetime = url_lifetime
+        self._uploads = 0
+
+    async def send(self, file=None, **kwargs):
+        self._log.calls['cache_upload'] += 1
+        self._log.calls['upload_bytes'] += len(file.fp.read())
+        file.close()
+        await asyncio.sleep(self._latency)
+        self._uploads += 1
+        expires = int(time.time() + self._url_lifetime)
+        url = f"https://cdn.example.invalid/attachments/1/{self._uploads}/{file.filename}?ex={expires:x}"
+        attachment = type('Attachment', (), {'url': url})()
+        return type('Message', (), {'id': self._uploads, 'attachments': [attachment]})()
+
+
+# --- Steam stand-in ---
+
+class SteamStub:
+    """Local appdetails endpoint; flip coming_soon, error_status and delay at any time."""
+
+    def __init__(self, app_id, coming_soon=True, error_status=None, delay=0.0):
+        self.app_id = str(app_id)
+        self.coming_soon = coming_soon
+        self.error_status = error_status
+        self.delay = delay
+        self.requests = 0
+        self.url = None
+        self._runner = None
+
+    async def _appdetails(self, request):
+        self.requests += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.error_status:
+            return web.Response(status=self.error_status, headers={'Retry-After': '5'})
+        return web.json_response({self.app_id: {
+            'success': True,
+            'data': {'release_date': {'coming_soon': self.coming_soon, 'date': ""}},
+        }})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/api/appdetails', self._appdetails)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+class WebhookStub:
+    """Local Discord webhook endpoint; with rate_limit_first, each webhook's first post gets a 429."""
+
+    def __init__(self, latency=0.0, rate_limit_first=False, retry_after=0.25):
+        self.latency = latency
+        self.rate_limit_first = rate_limit_first
+        self.retry_after = retry_after
+        self.posts = collections.Counter()       # webhook id -> posts accepted
+        self.rate_limited = collections.Counter()
+        self.url = None
+        self._runner = None
+
+    async def _execute(self, request):
+        webhook_id = request.match_info['webhook_id']
+        await request.json()
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.rate_limit_first and not self.rate_limited[webhook_id]:
+            self.rate_limited[webhook_id] += 1
+            return web.json_response({'message': "You are being rate limited.", 'retry_after': self.retry_after,
+                                      'global': False}, status=429)
+        self.posts[webhook_id] += 1
+        return web.json_response({'id': str(sum(self.posts.values())), 'webhook_id': webhook_id},
+                                 headers={'X-RateLimit-Remaining': '4', 'X-RateLimit-Reset-After': '1'})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post('/api/webhooks/{webhook_id}/{token}', self._execute)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+# --- Load phases ---
+
+async def countdown_burst(log, invocations, latency, animated=False):
+    """Runs invocations concurrent /countdown calls. Returns (latencies in ms, errors, wall seconds)."""
+    async def one():
+        interaction = FakeInteraction(log, latency)
+        start = time.perf_counter()
+        await bot.countdown_command.callback(interaction, animated=animated, target=None)
+        return (time.perf_counter() - start) * 1000, interaction.error
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one() for _ in range(invocations)))
+    wall = time.perf_counter() - start
+    return [latency_ms for latency_ms, _ in results], [error for _, error in results if error], wall
+
+
+def _phase_report(log, before, steam, steam_before, latencies, errors, wall):
+    report = {'wall_s': round(wall, 3)}
+    if latencies:
+        report.update({
+            'invocations': len(latencies),
+            'throughput_per_s': round(len(latencies) / wall, 1),
+            'p50_ms': round(_percentile(latencies, 0.50), 2),
+            'p95_ms': round(_percentile(latencies, 0.95), 2),
+            'p99_ms': round(_percentile(latencies, 0.99), 2),
+            'max_ms': round(max(latencies), 2),
+            'mean_ms': round(statistics.fmean(latencies), 2),
+            'errors': len(errors),
+            'error_samples': sorted(set(errors))[:3],
+        })
+    after = log.snapshot()
+    report['outbound'] = {kind: after.get(kind, 0) - before.get(kind, 0) for kind in after
+                          if after.get(kind, 0) != before.get(kind, 0)}
+    report['outbound']['steam_requests'] = steam.requests - steam_before
+    return report
+
+
+async def run_load_test(invocations=2000, discord_latency=0.0, steam_delay=0.0, steam_error=None, animated=False,
+                        embed=False, announce_channels=0, announce_webhooks=0, webhook_429=False):
+    log = CallLog()
+    target = next(iter(bot.targets.values()))
+    # A release a couple of days out, so the countdown image is rendered
+    target.release_date = (datetime.datetime.now(bot.JAPAN_TIMEZONE) + datetime.timedelta(days=2, hours=3)).replace(microsecond=0)
+    target.game_released = target.tomorrow_message_sent = target.release_message_sent = False
+    steam_status = bot.steam_statuses[target.steam_app_id]
+
+    steam = SteamStub(target.steam_app_id, coming_soon=True, error_status=steam_error, delay=steam_delay)
+    await steam.start()
+    channel = FakeChannel(log, discord_latency, target.channel_id)
+    channels = {target.channel_id: channel}
+    for i in range(announce_channels):
+        channels[target.channel_id + 1 + i] = FakeChannel(log, discord_latency, target.channel_id + 1 + i)
+    target.announce_channel_ids = [channel_id for channel_id in channels if channel_id != target.channel_id]
+    bot.bot.get_channel = channels.get
+    bot.state_store = StateStore(os.environ['STATE_DB'])
+    bot.announcer.store = bot.state_store
+    webhooks = WebhookStub(discord_latency, webhook_429)
+    await webhooks.start()
+    target.announce_webhooks = [f"{webhooks.url}/api/webhooks/{9000 + i}/token" for i in range(announce_webhooks)]
+    session = create_http_session()
+    bot.bot.http_session = session
+    steam_status.session = session
+    steam_status.base_url = steam.url
+    if embed:
+        cache_channel = FakeCacheChannel(log, discord_latency)
+        bot.attachment_cache = AttachmentCache(lambda: cache_channel)
+
+    results = {
+        'meta': {
+            'invocations': invocations,
+            'discord_latency_ms': discord_latency * 1000,
+            'steam_delay_ms': steam_delay * 1000,
+            'steam_error': steam_error,
+            'animated': animated,
+            'embed': embed,
+            'announce_channels': announce_channels,
+            'announce_webhooks': announce_webhooks,
+            'webhook_429': webhook_429,
+            'render_executor': bot.render_pool.kind,
+            'render_workers': bot.render_pool.workers,
+        },
+        'phases': {},
+    }
+    try:
+        await bot.render_pool.warm()
+
+        # Before release: the channel rename and a burst of /countdown calls
+        before, steam_before = log.snapshot(), steam.requests
+        await bot.update_countdown(target)
+        latencies, errors, wall = await countdown_burst(log, invocations, discord_latency, animated)
+        results['phases']['before_release'] = _phase_report(log, before, steam, steam_before, latencies, errors, wall)
+
+        # Release: Steam flips while /countdown traffic keeps coming in
+        before, steam_before = log.snapshot(), steam.requests
+        steam.coming_soon = False
+        steam.error_status = None
+        start = time.perf_counter()
+        burst = asyncio.ensure_future(countdown_burst(log, invocations, discord_latency, animated))
+        await bot.check_steam_status(target.steam_app_id)
+        latencies, errors, _ = await burst
+        announcement = bot.announcer.reports.get(target.key, {})
+        slowest = sorted((row for row in announcement.get('deliveries', []) if row['latency_s'] is not None),
+                         key=lambda row: row['latency_s'], reverse=True)
+        results['phases']['release_transition'] = {
+            **_phase_report(log, before, steam, steam_before, latencies, errors, time.perf_counter() - start),
+            'announced': target.release_message_sent,
+            'channel_name': channel.name,
+            'announcement': {
+                **{key: value for key, value in announcement.items() if key != 'deliveries'},
+                'slowest': slowest[:3],
+                'webhook_posts': sum(webhooks.posts.values()),
+                'webhook_429s': sum(webhooks.rate_limited.values()),
+            },
+        }
+
+        # Announcing again (as after a restart) must not send anything twice
+        before = log.snapshot()
+        posts_before = sum(webhooks.posts.values())
+        target.release_message_sent = False
+        await bot.announce_release(target)
+        results['phases']['repeat_announcement'] = {
+            'skipped': bot.announcer.reports[target.key]['skipped'],
+            'channel_sends': log.snapshot().get('channel_send', 0) - before.get('channel_send', 0),
+            'webhook_posts': sum(webhooks.posts.values()) - posts_before,
+        }
+
+        # After release: everything should come from state and the render cache
+        before, steam_before = log.snapshot(), steam.requests
+        latencies, errors, wall = await countdown_burst(log, invocations, discord_latency, animated)
+        results['phases']['after_release'] = _phase_report(log, before, steam, steam_before, latencies, errors, wall)
+        results['render_cache'] = bot.render_cache.stats()
+        if bot.attachment_cache is not None:
+            results['attachment_cache'] = bot.attachment_cache.stats()
+    finally:
+        bot.scheduler.stop()
+        await session.close()
+        await steam.stop()
+        await webhooks.stop()
+        bot.state_store.close()
+        bot.render_pool.shutdown()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the bot against local Discord and Steam stand-ins.")
+    parser.add_argument('--invocations', type=int, default=2000, help="Concurrent /countdown calls per phase (default: 2000)")
+    parser.add_argument('--discord-latency', type=float, default=0.0, help="Milliseconds each fake Discord call takes (default: 0)")
+    parser.add_argument('--steam-delay', type=float, default=0.0, help="Milliseconds the Steam stub waits before answering (default: 0)")
+    parser.add_argument('--steam-error', type=int, default=None,
+                        help="HTTP status the Steam stub returns before release, e.g. 429 or 500 (default: none)")
+    parser.add_argument('--animated', action='store_true', help="Request animated countdowns")
+    parser.add_argument('--embed', action='store_true',
+                        help="Upload each image once to a fake cache channel and reply with embeds")
+    parser.add_argument('--announce-channels', type=int, default=0,
+                        help="Extra fake channels the release is announced in (default: 0)")
+    parser.add_argument('--announce-webhooks', type=int, default=0,
+                        help="Webhooks on a local stub the release is announced through (default: 0)")
+    parser.add_argument('--webhook-429', action='store_true', help="Rate-limit each webhook's first post")
+    parser.add_argument('--verbose', action='store_true', help="Show the bot's own log output")
+    parser.add_argument('--output', help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    bot_output = sys.stdout if args.verbose else io.StringIO()
+    with contextlib.redirect_stdout(bot_output):
+        results = asyncio.run(run_load_test(args.invocations, args.discord_latency / 1000, args.steam_delay / 1000,
+                                            args.steam_error, args.animated, args.embed, args.announce_channels,
+                                            args.announce_webhooks, args.webhook_429))
+    report = json.dumps(results, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import datetime
+
+import pytz
+
+# --- Locales ---
+# Only scripts the bundled pixel font has glyphs for (Latin and Cyrillic).
+DEFAULT_LOCALE = 'en'
+LOCALES = {
+    'en': "English",
+    'es': "Español",
+    'fr': "Français",
+    'de': "Deutsch",
+    'pt-BR': "Português (Brasil)",
+    'ru': "Русский",
+}
+
+_MONTHS = {
+    'en': ("January", "February", "March", "April", "May", "June", "July",
+           "August", "September", "October", "November", "December"),
+    'es': ("enero", "febrero", "marzo", "abril", "mayo", "junio", "julio",
+           "agosto", "septiembre", "octubre", "noviembre", "diciembre"),
+    'fr': ("janvier", "février", "mars", "avril", "mai", "juin", "juillet",
+           "août", "septembre", "octobre", "novembre", "décembre"),
+    'de': ("Januar", "Februar", "März", "April", "Mai", "Juni", "Juli",
+           "August", "September", "Oktober", "November", "Dezember"),
+    'pt-BR': ("janeiro", "fevereiro", "março", "abril", "maio", "junho", "julho",
+              "agosto", "setembro", "outubro", "novembro", "dezembro"),
+    'ru': ("января", "февраля", "марта", "апреля", "мая", "июня", "июля",
+           "августа", "сентября", "октября", "ноября", "декабря"),
+}
+
+# (with year, without year)
+_DATE_FORMATS = {
+    'en': ("{month} {day}, {year}", "{month} {day}"),
+    'es': ("{day} de {month} de {year}", "{day} de {month}"),
+    'fr': ("{day} {month} {year}", "{day} {month}"),
+    'de': ("{day}. {month} {year}", "{day}. {month}"),
+    'pt-BR': ("{day} de {month} de {year}", "{day} de {month}"),
+    'ru': ("{day} {month} {year}", "{day} {month}"),
+}
+
+_STRINGS = {
+    'en': {
+        'subtitle': "Chapters 1-4",
+        'releasing_on': "Releasing on {date}",
+        'released': "Released!",
+        'footnote_default': "* {date} in Japan, Australia, and New Zealand",
+        'footnote_local': "* {time} your time ({offset})",
+        'days_until': "**{days} days** until {title} releases !",
+        'tomorrow': "**{title} releases tomorrow!**  Get ready!",
+        'hours_until': "**{hours} hours** until {title} releases !",
+        'hour_until': "**{hours} hour** until {title} releases !",
+        'today': "**{title} releases today!**  Keep an eye on Steam!",
+        'passed': "The target release time has passed. It should be out or releasing very soon! Check Steam for the latest.",
+        'out_now': "{title} is out now! Go play it! {url}",
+        'busy': "I'm a bit busy right now, please try again in a few seconds!",
+        'image_error': "Sorry, there was an error generating the countdown image.",
+        'error': "Sorry, I encountered an error processing your request.",
+        'settings_saved': "Saved! Your countdowns now use timezone {timezone} and {language}.",
+        'settings_current': "Your countdowns use timezone {timezone} and {language}.",
+        'settings_unknown_timezone': "Unknown timezone '{timezone}'. Try a name like America/New_York or Europe/Berlin.",
+        'timezone_unset': "(not set)",
+    },
+    'es': {
+        'subtitle': "Capítulos 1-4",
+        'releasing_on': "Sale el {date}",
+        'released': "¡Disponible!",
+        'footnote_default': "* {date} en Japón, Australia y Nueva Zelanda",
+        'footnote_local': "* a las {time}, tu hora ({offset})",
+        'days_until': "¡Faltan **{days} días** para que salga {title}!",
+        'tomorrow': "**¡{title} sale mañana!**  ¡Prepárate!",
+        'hours_until': "¡Faltan **{hours} horas** para que salga {title}!",
+        'hour_until': "¡Falta **{hours} hora** para que salga {title}!",
+        'today': "**¡{title} sale hoy!**  ¡Atento a Steam!",
+        'passed': "La hora de lanzamiento ya pasó. ¡Debería salir muy pronto! Revisa Steam.",
+        'out_now': "¡{title} ya está disponible! ¡A jugar! {url}",
+        'busy': "Estoy un poco ocupado, ¡inténtalo de nuevo en unos segundos!",
+        'image_error': "Lo siento, hubo un error al generar la imagen de la cuenta atrás.",
+        'error': "Lo siento, hubo un error al procesar tu solicitud.",
+        'settings_saved': "¡Guardado! Tus cuentas atrás usan la zona horaria {timezone} y {language}.",
+        'settings_current': "Tus cuentas atrás usan la zona horaria {timezone} y {language}.",
+        'settings_unknown_timezone': "Zona horaria desconocida '{timezone}'. Prueba con un nombre como America/Mexico_City o Europe/Madrid.",
+        'timezone_unset': "(sin definir)",
+    },
+    'fr': {
+        'subtitle': "Chapitres 1-4",
+        'releasing_on': "Sortie le {date}",
+        'released': "Disponible !",
+        'footnote_default': "* {date} au Japon, en Australie et en N.-Zélande",
+        'footnote_local': "* à {time}, heure locale ({offset})",
+        'days_until': "**{days} jours** avant la sortie de {title} !",
+        'tomorrow': "**{title} sort demain !**  Préparez-vous !",
+        'hours_until': "**{hours} heures** avant la sortie de {title} !",
+        'hour_until': "**{hours} heure** avant la sortie de {title} !",
+        'today': "**{title} sort aujourd'hui !**  Surveillez Steam !",
+        'passed': "L'heure de sortie est passée. Le jeu devrait sortir très bientôt ! Vérifiez sur Steam.",
+        'out_now': "{title} est disponible ! Allez-y ! {url}",
+        'busy': "Je suis un peu occupé, réessayez dans quelques secondes !",
+        'image_error': "Désolé, une erreur est survenue lors de la création de l'image.",
+        'error': "Désolé, une erreur est survenue lors du traitement de votre demande.",
+        'settings_saved': "Enregistré ! Vos comptes à rebours utilisent le fuseau {timezone} et {language}.",
+        'settings_current': "Vos comptes à rebours utilisent le fuseau {timezone} et {language}.",
+        'settings_unknown_timezone': "Fuseau horaire inconnu '{timezone}'. Essayez un nom comme Europe/Paris ou America/Montreal.",
+        'timezone_unset': "(non défini)",
+    },
+    'de': {
+        'subtitle': "Kapitel 1-4",
+        'releasing_on': "Erscheint am {date}",
+        'released': "Erschienen!",
+        'footnote_default': "* {date} in Japan, Australien und Neuseeland",
+        'footnote_local': "* um {time} Uhr deiner Zeit ({offset})",
+        'days_until': "Noch **{days} Tage**, bis {title} erscheint!",
+        'tomorrow': "**{title} erscheint morgen!**  Mach dich bereit!",
+        'hours_until': "Noch **{hours} Stunden**, bis {title} erscheint!",
+        'hour_until': "Noch **{hours} Stunde**, bis {title} erscheint!",
+        'today': "**{title} erscheint heute!**  Behalte Steam im Auge!",
+        'passed': "Der Erscheinungstermin ist vorbei. Es sollte jeden Moment so weit sein! Schau auf Steam nach.",
+        'out_now': "{title} ist jetzt erhältlich! Los, spiel es! {url}",
+        'busy': "Ich bin gerade etwas beschäftigt, versuch es in ein paar Sekunden noch einmal!",
+        'image_error': "Beim Erstellen des Countdown-Bildes ist leider ein Fehler aufgetreten.",
+        'error': "Bei deiner Anfrage ist leider ein Fehler aufgetreten.",
+        'settings_saved': "Gespeichert! Deine Countdowns nutzen die Zeitzone {timezone} und {language}.",
+        'settings_current': "Deine Countdowns nutzen die Zeitzone {timezone} und {language}.",
+        'settings_unknown_timezone': "Unbekannte Zeitzone '{timezone}'. Versuch einen Namen wie Europe/Berlin oder Europe/Vienna.",
+        'timezone_unset': "(nicht gesetzt)",
+    },
+    'pt-BR': {
+        'subtitle': "Capítulos 1-4",
+        'releasing_on': "Lançamento em {date}",
+        'released': "Lançado!",
+        'footnote_default': "* {date} no Japão, Austrália e Nova Zelândia",
+        'footnote_local': "* às {time}, seu horário ({offset})",
+        'days_until': "**{days} dias** até o lançamento de {title}!",
+        'tomorrow': "**{title} será lançado amanhã!**  Prepare-se!",
+        'hours_until': "**{hours} horas** até o lançamento de {title}!",
+        'hour_until': "**{hours} hora** até o lançamento de {title}!",
+        'today': "**{title} será lançado hoje!**  Fique de olho na Steam!",
+        'passed': "O horário de lançamento já passou. Deve sair a qualquer momento! Confira a Steam.",
+        'out_now': "{title} já foi lançado! Vá jogar! {url}",
+        'busy': "Estou um pouco ocupado agora, tente de novo em alguns segundos!",
+        'image_error': "Desculpe, houve um erro ao gerar a imagem da contagem regressiva.",
+        'error': "Desculpe, houve um erro ao processar seu pedido.",
+        'settings_saved': "Salvo! Suas contagens usam o fuso horário {timezone} e {language}.",
+        'settings_current': "Suas contagens usam o fuso horário {timezone} e {language}.",
+        'settings_unknown_timezone': "Fuso horário desconhecido '{timezone}'. Tente um nome como America/Sao_Paulo.",
+        'timezone_unset': "(não definido)",
+    },
+    'ru': {
+        'subtitle': "Главы 1-4",
+        'releasing_on': "Выходит {date}",
+        'released': "Вышла!",
+        'footnote_default': "* {date} в Японии, Австралии и Новой Зеландии",
+        'footnote_local': "* в {time} по вашему времени ({offset})",
+        'days_until': "Дней до выхода {title}: **{days}**",
+        'tomorrow': "**{title} выходит завтра!**  Готовьтесь!",
+        'hours_until': "Часов до выхода {title}: **{hours}**",
+        'hour_until': "До выхода {title} остался **{hours} час**!",
+        'today': "**{title} выходит сегодня!**  Следите за Steam!",
+        'passed': "Время выхода уже наступило. Игра вот-вот появится! Проверьте Steam.",
+        'out_now': "{title} уже вышла! Скорее играть! {url}",
+        'busy': "Я сейчас немного занят, попробуйте через несколько секунд!",
+        'image_error': "Не удалось создать изображение обратного отсчёта.",
+        'error': "При обработке запроса произошла ошибка.",
+        'settings_saved': "Сохранено! Обратный отсчёт: часовой пояс {timezone}, язык {language}.",
+        'settings_current': "Обратный отсчёт: часовой пояс {timezone}, язык {language}.",
+        'settings_unknown_timezone': "Неизвестный часовой пояс '{timezone}'. Попробуйте, например, Europe/Moscow.",
+        'timezone_unset': "(не задан)",
+    },
+}
+
+
+def resolve_locale(locale):
+    return locale if locale in LOCALES else DEFAULT_LOCALE
+
+
+def translate(locale, key, **values):
+    """Returns the string for key in locale (falling back to English), formatted with values."""
+    strings = _STRINGS.get(locale, _STRINGS[DEFAULT_LOCALE])
+    return strings.get(key, _STRINGS[DEFAULT_LOCALE][key]).format(**values)
+
+
+def format_date(locale, date, with_year=True):
+    locale = resolve_locale(locale)
+    date_format = _DATE_FORMATS[locale][0 if with_year else 1]
+    return date_format.format(month=_MONTHS[locale][date.month - 1], day=date.day, year=date.year)
+
+
+def format_time(locale, moment):
+    if resolve_locale(locale) == 'en':
+        return moment.strftime('%I:%M %p').lstrip('0')
+    return moment.strftime('%H:%M')
+
+
+def format_offset(offset_minutes):
+    if offset_minutes == 0:
+        return "UTC"
+    sign = '+' if offset_minutes > 0 else '-'
+    hours, minutes = divmod(abs(offset_minutes), 60)
+    return f"UTC{sign}{hours:02d}:{minutes:02d}"
+
+
+def is_valid_timezone(timezone_name):
+    try:
+        pytz.timezone(timezone_name)
+        return True
+    except (pytz.UnknownTimeZoneError, AttributeError, ValueError):
+        return False
+
+
+# --- Render Variants ---
+# Everything localized in the image depends only on the UTC offset in effect
+# at the release moment and the locale, so users sharing both share renders.
+
+def render_variant(release_date, timezone_name=None, locale=None):
+    """
+    Returns the (offset minutes at release or None, locale) variant for a
+    user's settings, or None for the default image.
+    """
+    locale = resolve_locale(locale)
+    offset = None
+    if timezone_name and is_valid_timezone(timezone_name):
+        offset = int(release_date.astimezone(pytz.timezone(timezone_name)).utcoffset().total_seconds() // 60)
+    if offset is None and locale == DEFAULT_LOCALE:
+        return None
+    return (offset, locale)
+
+
+def image_texts(release_date, variant):
+    """
+    Returns the localized (subtitle, date line, footnote, released text) for
+    the image. The default variant uses the same lines as
+    countdown.get_release_date_display_text and get_release_footnote_text.
+    """
+    from countdown import get_release_date_display_text, get_release_footnote_text, uses_default_date_wording
+
+    if variant is None:
+        return (_STRINGS['en']['subtitle'], get_release_date_display_text(release_date),
+                get_release_footnote_text(release_date), _STRINGS['en']['released'])
+
+    offset, locale = variant
+    subtitle = translate(locale, 'subtitle')
+    released = translate(locale, 'released')
+    if offset is None and not uses_default_date_wording(release_date):
+        # Same dates as the default image, in the user's language: the release
+        # date and time in the target's own time zone
+        date_line = translate(locale, 'releasing_on', date=format_date(locale, release_date.date()))
+        offset_minutes = int(release_date.utcoffset().total_seconds() // 60)
+        footnote = f"* {format_time(locale, release_date)} ({format_offset(offset_minutes)})"
+    elif offset is None:
+        # Same dates as the default image, in the user's language: the day
+        # before the JST release date, with the JST date in the footnote
+        jst_date = release_date.astimezone(pytz.timezone('Asia/Tokyo')).date()
+        date_line = translate(locale, 'releasing_on', date=format_date(locale, jst_date - datetime.timedelta(days=1)))
+        footnote = translate(locale, 'footnote_default', date=format_date(locale, jst_date, with_year=False))
+    else:
+        local_release = release_date.astimezone(datetime.timezone(datetime.timedelta(minutes=offset)))
+        date_line = translate(locale, 'releasing_on', date=format_date(locale, local_release.date()))
+        footnote = translate(locale, 'footnote_local', time=format_time(locale, local_release), offset=format_offset(offset))
+    return subtitle, date_line, footnote, released
+
+
+if __name__ == "__main__":
+    # Check every localized line fits the image, shrinking it no further than the renderer will
+    from countdown import MIN_FONT_SCALE, load_assets
+
+    plan = load_assets()
+    slot_fonts = {step.slot: step.font for step in plan.steps if step.slot}
+    fonts = [slot_fonts['subtitle'], slot_fonts['date'], slot_fonts['footnote']]
+    available_width = plan.width - 2 * plan.padding
+    release = pytz.timezone('Asia/Tokyo').localize(datetime.datetime(2025, 9, 25, 0, 0))
+    too_wide, shrunk = [], 0
+    for locale in LOCALES:
+        for timezone_name in (None, 'America/Los_Angeles', 'Asia/Kolkata'):
+            variant = render_variant(release, timezone_name, locale) or (None, locale)
+            subtitle, date_line, footnote, _ = image_texts(release, variant)
+            for font, text in zip(fonts, (subtitle, date_line, footnote)):
+                width = font.getlength(text)
+                if width > available_width:
+                    shrunk += 1
+                if width * MIN_FONT_SCALE > available_width:
+                    too_wide.append((locale, text, width))
+            print(f"{locale:6} {timezone_name or '-':20} {date_line} | {footnote}")
+    print(f"All localized lines fit ({shrunk} shrunk)." if not too_wide else f"Too wide: {too_wide}")
@@ -0,0 +1,247 @@
+import asyncio
+import bisect
+import contextlib
+import os
+import threading
+import time
+
+# --- Configuration ---
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))          # 0 disables the HTTP endpoint
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+LOOP_LAG_INTERVAL = float(os.getenv('LOOP_LAG_INTERVAL', '0.5'))  # Seconds between event-loop lag samples
+
+# Seconds; covers sub-millisecond cache hits up to slow uploads
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(label_key, extra=()):
+    items = [*label_key, *extra]
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in items) + "}"
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _describe(name, label_items):
+    if not label_items:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in label_items) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_key(labels), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Gauge:
+    """A value read at scrape time from func(), which returns a number or a dict of label-item tuples to numbers."""
+
+    def __init__(self, name, help_text, func):
+        self.name = name
+        self.help = help_text
+        self.func = func
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        try:
+            value = self.func()
+        except Exception as e:
+            print(f"Error reading gauge {self.name}: {e}")
+            return lines
+        if isinstance(value, dict):
+            for labels, v in sorted(value.items()):
+                lines.append(f"{self.name}{_format_labels(_label_key(dict(labels)))} {v}")
+        else:
+            lines.append(f"{self.name} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label key -> [bucket counts..., +Inf count], sum
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self, **labels):
+        """Returns (count, sum, approximate p50, approximate p95) for one label set, or None."""
+        series = self._series.get(_label_key(labels))
+        if series is None:
+            return None
+        counts, total = series
+        count = sum(counts)
+        return count, total, self._quantile(counts, count, 0.5), self._quantile(counts, count, 0.95)
+
+    def label_sets(self):
+        return [dict(key) for key in sorted(self._series)]
+
+    def _quantile(self, counts, count, fraction):
+        # Upper bound of the bucket the quantile falls in
+        rank = fraction * count
+        seen = 0
+        for bound, bucket_count in zip((*self.buckets, float('inf')), counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, (counts, total) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float('inf')), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float('inf') else repr(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(key, (('le', le),))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        existing = self._metrics.get(metric.name)
+        if existing is not None:
+            return existing
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text):
+        return self._register(Counter(name, help_text))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, buckets))
+
+    def gauge(self, name, help_text, func):
+        # Gauges are re-registered when their source object changes
+        metric = Gauge(name, help_text, func)
+        self._metrics[name] = metric
+        return metric
+
+    def render_prometheus(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        """Short human-readable digest of every histogram and counter, for /stats."""
+        lines = []
+        for metric in self._metrics.values():
+            if isinstance(metric, Histogram):
+                for labels in metric.label_sets():
+                    count, total, p50, p95 = metric.snapshot(**labels)
+                    lines.append(f"{_describe(metric.name, labels.items())}: n={count} mean={total / count * 1000:.1f}ms "
+                                 f"p50<={p50 * 1000:.0f}ms p95<={p95 * 1000:.0f}ms")
+            elif isinstance(metric, Counter):
+                for key, value in sorted(metric._values.items()):
+                    lines.append(f"{_describe(metric.name, key)}: {value}")
+        return "\n".join(lines)
+
+
+# Process-wide registry used by every module
+REGISTRY = MetricsRegistry()
+
+COUNTDOWN_SECONDS = REGISTRY.histogram(
+    'countdown_command_seconds', "Time spent in /countdown, by phase (defer, steam, render, upload, total)")
+STEAM_REQUEST_SECONDS = REGISTRY.histogram('steam_request_seconds', "Steam appdetails request latency")
+STEAM_REQUESTS = REGISTRY.counter('steam_requests_total', "Steam appdetails requests, by HTTP status or error")
+CHANNEL_EDITS = REGISTRY.counter('channel_edits_total', "Channel renames, by outcome (ok, forbidden, http_<status>, error)")
+ANNOUNCEMENT_SECONDS = REGISTRY.histogram(
+    'announcement_delivery_seconds', "Time from release detection to each announcement being delivered, by kind",
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0))
+ANNOUNCEMENTS = REGISTRY.counter(
+    'announcement_deliveries_total', "Release announcement delivery attempts, by kind and outcome")
+EVENT_LOOP_LAG = REGISTRY.histogram(
+    'event_loop_lag_seconds', "How late the event loop ran a periodic sampler callback",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+
+
+def record_channel_edit(outcome):
+    CHANNEL_EDITS.inc(outcome=outcome)
+
+
+def channel_edit_outcome(exception):
+    """Maps a channel.edit exception (or None for success) to a CHANNEL_EDITS outcome label."""
+    if exception is None:
+        return 'ok'
+    status = getattr(exception, 'status', None)
+    if status == 403:
+        return 'forbidden'
+    if status is not None:
+        return f'http_{status}'
+    return 'error'
+
+
+async def sample_event_loop_lag(interval=LOOP_LAG_INTERVAL):
+    """Runs forever, recording how late each interval-second sleep wakes up."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - start - interval))
+
+
+async def start_metrics_server(registry=REGISTRY, host=METRICS_HOST, port=METRICS_PORT):
+    """Serves registry in Prometheus text format at http://host:port/metrics. Returns the runner, or None if disabled."""
+    if not port:
+        return None
+    from aiohttp import web
+
+    async def handle_metrics(request):
+        return web.Response(text=registry.render_prometheus(), content_type='text/plain', charset='utf-8',
+                            headers={'X-Content-Type-Options': 'nosniff'})
+
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    print(f"Metrics available at http://{host}:{port}/metrics")
+    return runner
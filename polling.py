@@ -0,0 +1,104 @@
+import json
+import os
+import random
+import time
+
+# --- Configuration (seconds) ---
+STEAM_POLL_FAR = float(os.getenv('STEAM_POLL_FAR', '900'))              # More than a day from launch
+STEAM_POLL_NEAR = float(os.getenv('STEAM_POLL_NEAR', '60'))             # Within a day of launch
+STEAM_POLL_WINDOW = float(os.getenv('STEAM_POLL_WINDOW', '15'))         # Inside the launch window
+STEAM_POLL_WINDOW_BEFORE = float(os.getenv('STEAM_POLL_WINDOW_BEFORE', str(2 * 3600)))
+STEAM_POLL_WINDOW_AFTER = float(os.getenv('STEAM_POLL_WINDOW_AFTER', str(6 * 3600)))
+STEAM_POLL_OVERDUE = float(os.getenv('STEAM_POLL_OVERDUE', '3600'))     # A day past launch and still not out
+STEAM_POLL_MAX_BACKOFF = float(os.getenv('STEAM_POLL_MAX_BACKOFF', '1800'))
+STEAM_CIRCUIT_THRESHOLD = int(os.getenv('STEAM_CIRCUIT_THRESHOLD', '5'))  # Consecutive failures before opening
+STEAM_CIRCUIT_RESET = float(os.getenv('STEAM_CIRCUIT_RESET', '300'))      # Seconds open before a trial poll
+
+CIRCUIT_CLOSED = 'closed'
+CIRCUIT_OPEN = 'open'
+CIRCUIT_HALF_OPEN = 'half-open'
+
+
+class SteamPollScheduler:
+    """
+    Decides how long to wait before the next Steam poll.
+
+    Polls sparsely far from launch and every STEAM_POLL_WINDOW seconds in the
+    window around it. Failures back off exponentially with jitter (never
+    sooner than a 429's Retry-After), and after STEAM_CIRCUIT_THRESHOLD
+    failures in a row the circuit opens: no polls for STEAM_CIRCUIT_RESET
+    seconds, then a single trial poll decides whether to close it again.
+    """
+
+    def __init__(self, release_date, rng=None, clock=time.monotonic):
+        self.release_date = release_date
+        self.failures = 0
+        self.circuit = CIRCUIT_CLOSED
+        self.opened_at = None
+        self._rng = rng or random.Random()
+        self._clock = clock
+
+    def base_interval(self, now):
+        """Returns (seconds, phase) for a healthy poll at datetime now."""
+        until_release = (self.release_date - now).total_seconds()
+        if -STEAM_POLL_WINDOW_AFTER <= until_release <= STEAM_POLL_WINDOW_BEFORE:
+            return STEAM_POLL_WINDOW, 'window'
+        if 0 < until_release <= 86400:
+            return STEAM_POLL_NEAR, 'near'
+        if until_release < -86400:
+            return STEAM_POLL_OVERDUE, 'overdue'
+        if until_release < 0:
+            return STEAM_POLL_NEAR, 'after-window'
+        return STEAM_POLL_FAR, 'far'
+
+    def allow_poll(self):
+        """Whether a poll should go out now. Moves an open circuit to half-open once its reset time has passed."""
+        if self.circuit == CIRCUIT_OPEN:
+            if self._clock() - self.opened_at < STEAM_CIRCUIT_RESET:
+                return False
+            self.circuit = CIRCUIT_HALF_OPEN
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.circuit = CIRCUIT_CLOSED
+        self.opened_at = None
+
+    def record_failure(self):
+        self.failures += 1
+        if self.circuit == CIRCUIT_HALF_OPEN or self.failures >= STEAM_CIRCUIT_THRESHOLD:
+            self.circuit = CIRCUIT_OPEN
+            self.opened_at = self._clock()
+
+    def next_delay(self, now, retry_after=None):
+        """Returns (seconds, reason) until the next poll, given the outcome recorded last."""
+        interval, phase = self.base_interval(now)
+
+        if self.circuit == CIRCUIT_OPEN:
+            remaining = STEAM_CIRCUIT_RESET - (self._clock() - self.opened_at)
+            return max(1.0, remaining), 'circuit-open'
+
+        if self.failures == 0:
+            return interval, phase
+
+        # Equal jitter: at least half the backoff, so retries don't bunch up
+        backoff = min(STEAM_POLL_MAX_BACKOFF, interval * (2 ** self.failures))
+        delay = backoff / 2 + self._rng.uniform(0, backoff / 2)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay, f'{phase}-backoff'
+
+    def log_decision(self, now, outcome, latency, delay, reason, http_status=None):
+        """Prints one JSON line describing a poll and the decision that followed."""
+        print(json.dumps({
+            'event': 'steam_poll',
+            'at': now.isoformat(),
+            'seconds_to_release': round((self.release_date - now).total_seconds()),
+            'outcome': outcome,
+            'http_status': http_status,
+            'latency_ms': round(latency * 1000, 1) if latency is not None else None,
+            'failures': self.failures,
+            'circuit': self.circuit,
+            'next_poll_s': round(delay, 1),
+            'reason': reason,
+        }))
@@ -0,0 +1,235 @@
+import asyncio
+import collections
+import datetime
+import logging
+import os
+import sys
+import threading
+import time
+
+# --- Configuration ---
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')                      # Where reports are written
+PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', '0.005'))        # Seconds between stack samples
+PROFILE_SECONDS = float(os.getenv('PROFILE_SECONDS', '30'))             # Length of a SIGUSR1-triggered profile
+SLOW_CALLBACK_MS = float(os.getenv('SLOW_CALLBACK_MS', '100'))          # asyncio slow-callback threshold
+PROFILE_MAX_SECONDS = 300
+PROFILE_TOP = 30
+
+# Leaf frames of a thread that is waiting for work rather than doing any
+_IDLE_LEAVES = {('select', 'selectors.py'), ('_worker', 'thread.py'), ('wait', 'threading.py')}
+
+
+class ProfileInProgress(Exception):
+    """Raised when a profile is requested while another one is still running."""
+
+
+def _describe_code(code):
+    filename = code.co_filename
+    cwd = os.getcwd() + os.sep
+    if filename.startswith(cwd):
+        filename = filename[len(cwd):]
+    elif 'site-packages' in filename:
+        filename = filename.split('site-packages' + os.sep, 1)[1]
+    return f"{code.co_name} ({filename}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of every thread in the process every interval seconds
+    from a background thread, so it sees both the event loop and the render
+    pool threads without slowing either down much. Functions are counted once
+    per sample they appear in (cumulative) and when they're on top of the
+    stack (self). Samples of idle threads (the loop waiting in select, pool
+    workers waiting for a job) are only counted, not attributed.
+
+    Process-pool render workers are separate processes and aren't sampled.
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self.samples = 0
+        self.cumulative = collections.Counter()
+        self.own = collections.Counter()
+        self.thread_samples = collections.Counter()
+        self.idle_samples = collections.Counter()
+        self.started_at = None
+        self.stopped_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.stopped_at = time.perf_counter()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                self._record(names.get(thread_id, str(thread_id)), frame)
+            self.samples += 1
+
+    def _record(self, thread_name, frame):
+        self.thread_samples[thread_name] += 1
+        leaf = frame.f_code
+        if (leaf.co_name, os.path.basename(leaf.co_filename)) in _IDLE_LEAVES:
+            self.idle_samples[thread_name] += 1
+            return
+        self.own[_describe_code(frame.f_code)] += 1
+        seen = set()
+        while frame is not None:
+            code = frame.f_code
+            if code not in seen:
+                seen.add(code)
+                self.cumulative[_describe_code(code)] += 1
+            frame = frame.f_back
+
+    def report(self, top=PROFILE_TOP):
+        """Returns a plain-text report of the top cumulative and self hot spots."""
+        duration = (self.stopped_at or time.perf_counter()) - (self.started_at or time.perf_counter())
+        total = (sum(self.thread_samples.values()) - sum(self.idle_samples.values())) or 1
+        lines = [f"Sampled {self.samples} times over {duration:.1f}s (every {self.interval * 1000:.1f}ms)", ""]
+
+        lines.append("Thread samples (busy / total):")
+        for name, count in self.thread_samples.most_common():
+            lines.append(f"  {count - self.idle_samples[name]:7d} / {count:7d}  {name}")
+
+        lines.extend(["", f"Top {top} by cumulative samples (% of busy thread samples):"])
+        for name, count in self.cumulative.most_common(top):
+            lines.append(f"  {count / total:6.1%}  {count:7d}  {name}")
+
+        lines.extend(["", f"Top {top} by self samples:"])
+        for name, count in self.own.most_common(top):
+            lines.append(f"  {count / total:6.1%}  {count:7d}  {name}")
+        return "\n".join(lines)
+
+
+class _SlowCallbackCollector(logging.Handler):
+    # Keeps the "Executing <Handle ...> took N seconds" warnings asyncio logs in debug mode
+    def __init__(self):
+        super().__init__(level=logging.WARNING)
+        self.messages = []
+
+    def emit(self, record):
+        message = record.getMessage()
+        if message.startswith("Executing "):
+            self.messages.append(message)
+
+
+_active = False
+
+
+async def profile_for(seconds, slow_callback_ms=None, interval=PROFILE_INTERVAL):
+    """
+    Profiles the running process for seconds and returns the text report.
+
+    Args:
+        seconds (float): How long to sample, capped at PROFILE_MAX_SECONDS.
+        slow_callback_ms (float, optional): If given, turns on asyncio debug mode for
+                                            the duration and lists every callback that
+                                            blocked the loop for longer than this.
+    Raises:
+        ProfileInProgress: if another profile is already running.
+    """
+    global _active
+    if _active:
+        raise ProfileInProgress("A profile is already running")
+    _active = True
+
+    seconds = max(0.1, min(float(seconds), PROFILE_MAX_SECONDS))
+    loop = asyncio.get_running_loop()
+    previous_debug = loop.get_debug()
+    previous_threshold = loop.slow_callback_duration
+    collector = None
+    asyncio_logger = logging.getLogger('asyncio')
+    if slow_callback_ms is not None:
+        collector = _SlowCallbackCollector()
+        asyncio_logger.addHandler(collector)
+        loop.slow_callback_duration = slow_callback_ms / 1000
+        loop.set_debug(True)
+
+    profiler = SamplingProfiler(interval)
+    print(f"Profiling for {seconds:g}s...")
+    profiler.start()
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        await asyncio.to_thread(profiler.stop)
+        if collector is not None:
+            loop.set_debug(previous_debug)
+            loop.slow_callback_duration = previous_threshold
+            asyncio_logger.removeHandler(collector)
+        _active = False
+
+    report = profiler.report()
+    if collector is not None:
+        lines = ["", f"Slow asyncio callbacks (over {slow_callback_ms:.0f}ms): {len(collector.messages)}"]
+        lines.extend(f"  {message}" for message in collector.messages[:PROFILE_TOP])
+        report += "\n" + "\n".join(lines)
+    return report
+
+
+def write_report(report, directory=PROFILE_DIR):
+    """Writes report to a timestamped file in directory and returns its path."""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"profile-{datetime.datetime.now():%Y%m%d-%H%M%S}.txt")
+    with open(path, 'w') as f:
+        f.write(report + "\n")
+    return path
+
+
+def install_signal_handler(seconds=PROFILE_SECONDS, slow_callback_ms=SLOW_CALLBACK_MS):
+    """
+    Profiles for seconds whenever the process gets SIGUSR1, writing the report
+    to PROFILE_DIR. Returns False where signal handlers aren't supported.
+    """
+    import signal
+
+    loop = asyncio.get_running_loop()
+
+    async def run():
+        try:
+            path = write_report(await profile_for(seconds, slow_callback_ms))
+            print(f"Profile written to {path}")
+        except ProfileInProgress:
+            print("Ignoring SIGUSR1: a profile is already running.")
+        except Exception as e:
+            print(f"Error profiling: {e}")
+
+    try:
+        loop.add_signal_handler(signal.SIGUSR1, lambda: loop.create_task(run()))
+    except (AttributeError, NotImplementedError, RuntimeError):
+        return False
+    return True
+
+
+if __name__ == "__main__":
+    # Profile a burst of renders on the thread pool, as the bot would run them
+    import countdown
+    from render_pool import RenderPool
+
+    async def main():
+        pool = RenderPool(kind='thread')
+        release_date = datetime.datetime(2030, 1, 1, tzinfo=datetime.timezone.utc)
+        date_text = countdown.get_release_date_display_text(release_date)
+
+        async def load():
+            for i in range(40):
+                timer_text = countdown.get_timer_text(False, release_date)
+                await pool.run(countdown.render_countdown_bytes, False, timer_text, date_text)
+
+        load_task = asyncio.create_task(load())
+        print(await profile_for(3, slow_callback_ms=SLOW_CALLBACK_MS))
+        await load_task
+        pool.shutdown()
+
+    asyncio.run(main())
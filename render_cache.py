@@ -0,0 +1,100 @@
+import asyncio
+import os
+from collections import OrderedDict
+
+# --- Configuration ---
+RENDER_CACHE_SIZE = int(os.getenv('RENDER_CACHE_SIZE', '64'))
+RENDER_CACHE_BYTES = int(os.getenv('RENDER_CACHE_BYTES', str(32 * 1024 * 1024)))  # Memory for cached images
+RENDER_CACHE_LOG_EVERY = 100  # Print a stats line every N lookups
+
+
+class RenderCache:
+    """
+    LRU of encoded image bytes with single-flight rendering, bounded by both
+    entry count and total size.
+
+    Everyone who asks for the same key in the same second gets the same bytes,
+    so only the first request renders; requests that arrive while that render
+    is still running await it instead of starting their own.
+    """
+
+    def __init__(self, max_entries=RENDER_CACHE_SIZE, max_bytes=RENDER_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> bytes
+        self._bytes = 0
+        self._in_flight = {}           # key -> asyncio.Future
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    async def get_or_render(self, key, render):
+        """
+        Returns the cached bytes for key, or awaits render() (a coroutine
+        function returning bytes or None) to produce them. None results are
+        handed to everyone waiting on the render but are not cached.
+        """
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self._maybe_log()
+            return self._entries[key]
+
+        future = self._in_flight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            self._maybe_log()
+            # shield: one waiter being cancelled mustn't cancel the shared render
+            return await asyncio.shield(future)
+
+        self.misses += 1
+        self._maybe_log()
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            data = await render()
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark retrieved so a render nobody else waited on doesn't log "exception never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(data)
+            if data is not None:
+                self._store(key, data)
+            return data
+        finally:
+            del self._in_flight[key]
+
+    def _store(self, key, data):
+        previous = self._entries.pop(key, None)
+        if previous is not None:
+            self._bytes -= len(previous)
+        self._entries[key] = data
+        self._bytes += len(data)
+        while len(self._entries) > 1 and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'in_flight': len(self._in_flight),
+            'dedup_rate': (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+    def _maybe_log(self):
+        lookups = self.hits + self.misses + self.coalesced
+        if lookups % RENDER_CACHE_LOG_EVERY == 0:
+            s = self.stats()
+            print(f"Render cache: {s['hits']} hits, {s['misses']} misses, {s['coalesced']} coalesced "
+                  f"({s['dedup_rate']:.0%} deduplicated), {s['entries']} entries")
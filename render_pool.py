@@ -0,0 +1,88 @@
+import asyncio
+import concurrent.futures
+import os
+
+import countdown
+
+# --- Configuration ---
+# RENDER_EXECUTOR: "thread" (default) or "process"
+RENDER_EXECUTOR = os.getenv('RENDER_EXECUTOR', 'thread').lower()
+RENDER_WORKERS = int(os.getenv('RENDER_WORKERS', str(min(4, os.cpu_count() or 1))))
+# Renders allowed to be running or queued at once; anything past this is turned away
+RENDER_MAX_PENDING = int(os.getenv('RENDER_MAX_PENDING', '32'))
+
+
+class RenderPoolBusy(Exception):
+    """Raised when the render queue is full."""
+
+
+def _warm_worker(releases=((None, None),)):
+    # Runs once in each worker process so the first render there is warm;
+    # releases are the (release_date, theme) pairs the bot will render
+    for release_date, theme in releases:
+        countdown.warm_up(release_date, theme)
+
+
+class RenderPool:
+    """
+    Runs blocking Pillow work off the event loop, in a thread pool by default
+    or a process pool with the assets pre-loaded in every worker.
+
+    warm_releases lists the (release_date, theme) pairs whose templates are
+    built ahead of the first render; None warms the default Deltarune image.
+    """
+
+    def __init__(self, kind=RENDER_EXECUTOR, workers=RENDER_WORKERS, max_pending=RENDER_MAX_PENDING,
+                 warm_releases=None):
+        if kind not in ('thread', 'process'):
+            print(f"Warning: unknown RENDER_EXECUTOR '{kind}', using a thread pool.")
+            kind = 'thread'
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.warm_releases = tuple(warm_releases) if warm_releases is not None else ((None, None),)
+        self.pending = 0
+        self.rejected = 0
+        self._executor = None
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == 'process':
+                self._executor = concurrent.futures.ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=_warm_worker, initargs=(self.warm_releases,))
+            else:
+                self._executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix='render')
+            print(f"Started {self.kind} render pool with {self.workers} worker(s), max {self.max_pending} pending.")
+        return self._executor
+
+    async def run(self, func, *args):
+        """
+        Runs func(*args) in the pool and returns its result. For a process pool
+        func and args must be picklable (module-level functions only).
+
+        Raises:
+            RenderPoolBusy: if max_pending renders are already running or queued.
+        """
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise RenderPoolBusy(f"{self.pending} renders already pending")
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.pending -= 1
+
+    async def warm(self):
+        """Starts the pool and pre-loads the render assets in it."""
+        try:
+            await self.run(_warm_worker, self.warm_releases)
+        except Exception as e:
+            print(f"Error warming render pool: {e}")
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,125 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+
+class TimerHeapScheduler:
+    """
+    Runs keyed callbacks at given times from a single task and a heap of
+    next-due events, so wakeups and memory don't grow with the number of
+    countdowns.
+
+    Each key has at most one pending event: scheduling a key again replaces
+    its previous event. Callbacks are coroutine functions; whatever they
+    return is ignored, so a callback reschedules its own key if it should run
+    again. A key's callback never runs twice at once. If a callback raises
+    before rescheduling its key, the key is retried in retry_delay seconds
+    (unless retry_delay is None), so one unexpected error doesn't end its
+    schedule for good.
+    """
+
+    def __init__(self, clock=time.monotonic, retry_delay=None):
+        self._clock = clock
+        self.retry_delay = retry_delay
+        self._heap = []                # (due, seq, key)
+        self._pending = {}             # key -> (due, seq, callback)
+        self._running = {}             # key -> asyncio.Task
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.wakeups = 0
+
+    def __len__(self):
+        return len(self._pending)
+
+    def schedule(self, key, delay, callback):
+        """Runs callback() for key in delay seconds, replacing any pending event for key."""
+        due = self._clock() + max(0.0, delay)
+        seq = next(self._seq)
+        self._pending[key] = (due, seq, callback)
+        heapq.heappush(self._heap, (due, seq, key))
+        if len(self._heap) > 2 * len(self._pending) + 64:
+            self._compact()
+        if self._heap[0][1] == seq:
+            # New earliest event; let the runner re-evaluate its sleep
+            self._wakeup.set()
+
+    def schedule_at(self, key, when, callback, now):
+        """Like schedule, with an absolute datetime when (now is the current datetime)."""
+        self.schedule(key, (when - now).total_seconds(), callback)
+
+    def cancel(self, key):
+        # The heap entry goes stale and is skipped when it surfaces
+        self._pending.pop(key, None)
+
+    def is_scheduled(self, key):
+        return key in self._pending or key in self._running
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for task in self._running.values():
+            task.cancel()
+
+    def _compact(self):
+        # Drop stale entries left behind by rescheduled or cancelled keys
+        self._heap = [(due, seq, key) for key, (due, seq, _) in self._pending.items()]
+        heapq.heapify(self._heap)
+
+    def _pop_stale(self):
+        while self._heap:
+            due, seq, key = self._heap[0]
+            pending = self._pending.get(key)
+            if pending is not None and pending[1] == seq:
+                return
+            heapq.heappop(self._heap)
+
+    async def _run(self):
+        while True:
+            self._pop_stale()
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            due, seq, key = self._heap[0]
+            delay = due - self._clock()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                    continue  # Something earlier was scheduled
+                except asyncio.TimeoutError:
+                    pass
+                self._pop_stale()
+                if not self._heap or self._heap[0][1] != seq:
+                    continue
+
+            heapq.heappop(self._heap)
+            _, _, callback = self._pending.pop(key)
+            self.wakeups += 1
+            if key in self._running:
+                # Previous run still going; try again shortly
+                self.schedule(key, 1.0, callback)
+                continue
+            task = asyncio.create_task(self._call(key, callback))
+            self._running[key] = task
+
+    async def _call(self, key, callback):
+        try:
+            await callback()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if self.retry_delay is not None and key not in self._pending:
+                print(f"Error in scheduled task '{key}': {e}. Retrying in {self.retry_delay:.0f}s.")
+                self.schedule(key, self.retry_delay, callback)
+            else:
+                print(f"Error in scheduled task '{key}': {e}")
+        finally:
+            self._running.pop(key, None)
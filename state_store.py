@@ -0,0 +1,199 @@
+import asyncio
+import concurrent.futures
+import json
+import os
+import sqlite3
+import time
+
+# --- Configuration ---
+STATE_DB = os.getenv('STATE_DB', 'deltarune_bot_state.db')
+
+TARGET_FIELDS = ('game_released', 'tomorrow_message_sent', 'release_message_sent', 'channel_name')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS targets (
+    key TEXT PRIMARY KEY,
+    game_released INTEGER NOT NULL DEFAULT 0,
+    tomorrow_message_sent INTEGER NOT NULL DEFAULT 0,
+    release_message_sent INTEGER NOT NULL DEFAULT 0,
+    channel_name TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS user_prefs (
+    user_id INTEGER PRIMARY KEY,
+    timezone TEXT,
+    locale TEXT,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS deliveries (
+    key TEXT PRIMARY KEY,
+    target TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    latency REAL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class StateStore:
+    """
+    Per-target bot state in SQLite (WAL mode): one row per countdown target
+    with its announcement flags and the channel name last applied, each
+    user's /countdown timezone and locale, and the outcome of every release
+    announcement delivery (so a restart never sends one twice).
+
+    Every write is a single-row upsert in its own transaction, so a crash
+    can't leave a half-written file behind. The async methods run the queries
+    on one dedicated thread, which keeps them off the event loop and in order.
+    """
+
+    def __init__(self, path=STATE_DB):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='state')
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._conn.close()
+
+    # --- Synchronous API (call from the store thread or before the loop starts) ---
+
+    def load_all(self):
+        """Returns {key: {field: value}} for every stored target."""
+        rows = self._conn.execute(
+            "SELECT key, game_released, tomorrow_message_sent, release_message_sent, channel_name FROM targets"
+        ).fetchall()
+        return {
+            row['key']: {
+                'game_released': bool(row['game_released']),
+                'tomorrow_message_sent': bool(row['tomorrow_message_sent']),
+                'release_message_sent': bool(row['release_message_sent']),
+                'channel_name': row['channel_name'],
+            }
+            for row in rows
+        }
+
+    def upsert(self, key, **fields):
+        """Inserts or updates one target's row with the given fields (see TARGET_FIELDS)."""
+        unknown = set(fields) - set(TARGET_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown state fields: {sorted(unknown)}")
+        columns = ['key', *fields, 'updated_at']
+        values = [key, *(int(v) if isinstance(v, bool) else v for v in fields.values()), time.time()]
+        updates = ', '.join(f"{name}=excluded.{name}" for name in [*fields, 'updated_at'])
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                f"INSERT INTO targets ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+                f"ON CONFLICT(key) DO UPDATE SET {updates}",
+                values,
+            )
+
+    def load_user_prefs(self):
+        """Returns {user_id: {'timezone': str or None, 'locale': str or None}} for every user with settings."""
+        rows = self._conn.execute("SELECT user_id, timezone, locale FROM user_prefs").fetchall()
+        return {row['user_id']: {'timezone': row['timezone'], 'locale': row['locale']} for row in rows}
+
+    def set_user_prefs(self, user_id, timezone, locale):
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "INSERT INTO user_prefs (user_id, timezone, locale, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET timezone=excluded.timezone, locale=excluded.locale, "
+                "updated_at=excluded.updated_at",
+                (user_id, timezone, locale, time.time()),
+            )
+
+    def load_deliveries(self, target_key):
+        """Returns {delivery key: {'status', 'attempts', 'latency'}} for one target's release announcement."""
+        rows = self._conn.execute(
+            "SELECT key, status, attempts, latency FROM deliveries WHERE target = ?", (target_key,)
+        ).fetchall()
+        return {row['key']: {'status': row['status'], 'attempts': row['attempts'], 'latency': row['latency']}
+                for row in rows}
+
+    def record_delivery(self, key, target_key, status, attempts, latency=None):
+        with self._conn:
+            self._conn.execute("BEGIN IMMEDIATE")
+            self._conn.execute(
+                "INSERT INTO deliveries (key, target, status, attempts, latency, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET status=excluded.status, attempts=excluded.attempts, "
+                "latency=excluded.latency, updated_at=excluded.updated_at",
+                (key, target_key, status, attempts, latency, time.time()),
+            )
+
+    def import_json_once(self, json_path, default_key):
+        """
+        Copies the old JSON state file into the database the first time the
+        store is opened with it. Both the single-countdown layout and the
+        per-target {"targets": {...}} layout are understood. Returns the number
+        of targets imported.
+        """
+        if self._get_meta('json_imported') or not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, 'r') as f:
+                state = json.load(f)
+        except Exception as e:
+            print(f"Error reading old state file '{json_path}' for import: {e}")
+            return 0
+
+        per_target = state.get('targets')
+        if per_target is None:
+            per_target = {default_key: state}
+        for key, target_state in per_target.items():
+            self.upsert(key, **{field: bool(target_state.get(field, False))
+                                for field in TARGET_FIELDS if field != 'channel_name'})
+        self._set_meta('json_imported', json_path)
+        print(f"Imported state for {len(per_target)} target(s) from {json_path}")
+        return len(per_target)
+
+    def _get_meta(self, name):
+        row = self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return row['value'] if row else None
+
+    def _set_meta(self, name, value):
+        with self._conn:
+            self._conn.execute(
+                "INSERT INTO meta (name, value) VALUES (?, ?) ON CONFLICT(name) DO UPDATE SET value=excluded.value",
+                (name, value),
+            )
+
+    # --- Async API ---
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, lambda: func(*args, **kwargs))
+
+    async def load_all_async(self):
+        return await self.run(self.load_all)
+
+    async def upsert_async(self, key, **fields):
+        return await self.run(self.upsert, key, **fields)
+
+    async def load_user_prefs_async(self):
+        return await self.run(self.load_user_prefs)
+
+    async def set_user_prefs_async(self, user_id, timezone, locale):
+        return await self.run(self.set_user_prefs, user_id, timezone, locale)
+
+    async def load_deliveries_async(self, target_key):
+        return await self.run(self.load_deliveries, target_key)
+
+    async def record_delivery_async(self, key, target_key, status, attempts, latency=None):
+        return await self.run(self.record_delivery, key, target_key, status, attempts, latency)
+
+    async def get_meta_async(self, name):
+        return await self.run(self._get_meta, name)
+
+    async def set_meta_async(self, name, value):
+        return await self.run(self._set_meta, name, value)
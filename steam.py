@@ -0,0 +1,131 @@
+import asyncio
+import os
+import time
+
+import aiohttp
+
+from metrics import STEAM_REQUEST_SECONDS, STEAM_REQUESTS
+
+# --- Configuration ---
+STEAM_API_BASE_URL = os.getenv('STEAM_API_BASE_URL', 'https://store.steampowered.com').rstrip('/')
+STEAM_STATUS_TTL = float(os.getenv('STEAM_STATUS_TTL', '30'))        # Seconds a release status stays fresh
+STEAM_ERROR_TTL = float(os.getenv('STEAM_ERROR_TTL', '5'))           # Seconds a failed check is remembered
+HTTP_CONNECTOR_LIMIT = int(os.getenv('HTTP_CONNECTOR_LIMIT', '10'))  # Max open connections
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv('HTTP_KEEPALIVE_TIMEOUT', '60'))
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', '10'))                # Total seconds per request
+
+
+def _parse_retry_after(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+def create_http_session():
+    """Creates the shared, pooled aiohttp session. Must be called with a running event loop."""
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_CONNECTOR_LIMIT,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+        ttl_dns_cache=300,
+    )
+    timeout = aiohttp.ClientTimeout(total=HTTP_TIMEOUT, connect=min(5.0, HTTP_TIMEOUT))
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+class SteamReleaseStatus:
+    """
+    Steam release status for one app, cached for STEAM_STATUS_TTL seconds.
+
+    Every caller reads through is_released(); when the cached value is stale
+    the first caller refreshes it and everyone else arriving meanwhile awaits
+    that same request, so a burst of /countdown calls costs one Steam hit.
+    """
+
+    def __init__(self, app_id, session=None, base_url=STEAM_API_BASE_URL, ttl=STEAM_STATUS_TTL, error_ttl=STEAM_ERROR_TTL):
+        self.app_id = str(app_id)
+        self.session = session      # Shared aiohttp session, owned by whoever created it
+        self.base_url = base_url.rstrip('/')
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.requests = 0
+        self._released = None       # Last successful answer, None until there is one
+        self._checked_at = None     # time.monotonic() of the last check
+        self.last_ok = False        # Whether the last check succeeded
+        self.last_http_status = None
+        self.last_retry_after = None
+        self.last_latency = None
+        self._refresh = None        # asyncio.Task while a request is in flight
+
+    @property
+    def url(self):
+        return f"{self.base_url}/api/appdetails?appids={self.app_id}"
+
+    async def fetch(self):
+        """
+        Asks Steam directly, bypassing the cache. The outcome is also kept in
+        last_http_status, last_retry_after and last_latency.
+
+        Returns:
+            bool or None: Whether the app is out, or None if the check failed.
+        """
+        self.last_http_status = None
+        self.last_retry_after = None
+        self.last_latency = None
+        if self.session is None or self.session.closed:
+            print("Error checking Steam status: no open HTTP session.")
+            return None
+        self.requests += 1
+        start = time.monotonic()
+        try:
+            async with self.session.get(self.url) as response:
+                self.last_http_status = response.status
+                if response.status != 200:
+                    self.last_retry_after = _parse_retry_after(response.headers.get('Retry-After'))
+                    print(f"Error checking Steam status: HTTP {response.status}")
+                    return None
+                data = await response.json(content_type=None)
+                if self.app_id in data and data[self.app_id]['success']:
+                    game_data = data[self.app_id]['data']
+                    return not game_data.get('release_date', {}).get('coming_soon', True)
+                return False
+        except Exception as e:
+            print(f"Error checking Steam status: {e}")
+            return None
+        finally:
+            self.last_latency = time.monotonic() - start
+            STEAM_REQUEST_SECONDS.observe(self.last_latency)
+            STEAM_REQUESTS.inc(status=self.last_http_status or 'error')
+
+    async def _refresh_status(self):
+        released = await self.fetch()
+        self._checked_at = time.monotonic()
+        self.last_ok = released is not None
+        if released is not None:
+            self._released = released
+        return released
+
+    async def is_released(self, max_age=None):
+        """
+        Returns whether Steam says the app is out, from cache if the last check
+        is fresh enough. Failed checks are retried after STEAM_ERROR_TTL and
+        fall back to the last known answer ("not released" if there is none).
+
+        Args:
+            max_age (float, optional): Overrides the TTL for this call; 0 forces
+                                       a refresh (still shared with concurrent callers).
+        """
+        if self._refresh is None:
+            max_age = self.ttl if max_age is None else max_age
+            if not self.last_ok:
+                max_age = min(max_age, self.error_ttl)
+            if self._checked_at is not None and time.monotonic() - self._checked_at < max_age:
+                return bool(self._released)
+            self._refresh = asyncio.ensure_future(self._refresh_status())
+            self._refresh.add_done_callback(self._clear_refresh)
+
+        await asyncio.shield(self._refresh)
+        return bool(self._released)
+
+    def _clear_refresh(self, task):
+        self._refresh = None
@@ -0,0 +1,120 @@
+import datetime
+import json
+import os
+
+import pytz
+
+from channel_schedule import RenameRateLimiter
+
+# --- Configuration ---
+# JSON list of countdown targets; see README. If the file doesn't exist the bot
+# runs a single Deltarune countdown in COUNTDOWN_CHANNEL_ID.
+TARGETS_FILE = os.getenv('COUNTDOWN_TARGETS_FILE', 'countdown_targets.json')
+
+DEFAULT_TARGET_KEY = "deltarune"
+DEFAULT_TIMEZONE = pytz.timezone('Asia/Tokyo')
+DEFAULT_RELEASE_DATE = datetime.datetime(2025, 6, 5, 0, 0, 0, tzinfo=DEFAULT_TIMEZONE) # Midnight JST
+DEFAULT_STEAM_APP_ID = "1671210"  # Deltarune's Steam App ID
+# Extra release announcement destinations for the single default countdown (comma-separated)
+ANNOUNCE_CHANNEL_IDS = os.getenv('ANNOUNCE_CHANNEL_IDS', '')
+ANNOUNCE_WEBHOOK_URLS = os.getenv('ANNOUNCE_WEBHOOK_URLS', '')
+
+
+def _split_list(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+class CountdownTarget:
+    """One countdown: a channel counting down to one game's release on Steam."""
+
+    def __init__(self, key, channel_id, release_date, steam_app_id, guild_id=None,
+                 title="Deltarune", channel_prefix="deltarune", store_url=None, theme=None,
+                 announce_channel_ids=(), announce_webhooks=()):
+        self.key = key
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.release_date = release_date
+        self.steam_app_id = str(steam_app_id)
+        self.title = title
+        self.channel_prefix = channel_prefix
+        self.store_url = store_url or f"https://store.steampowered.com/app/{self.steam_app_id}/"
+        self.theme = theme  # Image theme name; None uses COUNTDOWN_THEME
+        # Where the release is announced besides channel_id
+        self.announce_channel_ids = [int(channel_id) for channel_id in announce_channel_ids]
+        self.announce_webhooks = list(announce_webhooks)
+
+        # Announcement state, loaded from and saved to the state database
+        self.game_released = False
+        self.tomorrow_message_sent = False
+        self.release_message_sent = False
+        self.channel_name = None  # Last channel name the bot applied
+
+        self.rename_limiter = RenameRateLimiter()
+
+    @property
+    def finished(self):
+        return self.game_released and self.release_message_sent
+
+    def __repr__(self):
+        return f"CountdownTarget({self.key!r}, channel={self.channel_id}, app={self.steam_app_id})"
+
+
+def _parse_release_date(value, timezone_name):
+    release_date = datetime.datetime.fromisoformat(value)
+    if release_date.tzinfo is None:
+        release_date = pytz.timezone(timezone_name or 'Asia/Tokyo').localize(release_date)
+    return release_date
+
+
+def default_target(channel_id):
+    return CountdownTarget(
+        key=DEFAULT_TARGET_KEY,
+        channel_id=channel_id,
+        release_date=DEFAULT_RELEASE_DATE,
+        steam_app_id=DEFAULT_STEAM_APP_ID,
+        store_url=f"https://store.steampowered.com/app/{DEFAULT_STEAM_APP_ID}/DELTARUNE/",
+        announce_channel_ids=_split_list(ANNOUNCE_CHANNEL_IDS),
+        announce_webhooks=_split_list(ANNOUNCE_WEBHOOK_URLS),
+    )
+
+
+def load_targets(path=TARGETS_FILE, fallback_channel_id=None):
+    """
+    Loads the countdown targets from a JSON file, a list of objects with:
+    key, channel_id, release_date (ISO 8601), steam_app_id and optionally
+    guild_id, timezone (for naive release dates), title, channel_prefix,
+    store_url, theme, announce_channel_ids and announce_webhooks (extra
+    places the release is announced).
+
+    Falls back to the single Deltarune countdown in fallback_channel_id when
+    the file doesn't exist. Returns a dict of key -> CountdownTarget.
+    """
+    if not os.path.exists(path):
+        if fallback_channel_id is None:
+            return {}
+        target = default_target(fallback_channel_id)
+        return {target.key: target}
+
+    with open(path, 'r') as f:
+        entries = json.load(f)
+
+    targets = {}
+    for entry in entries:
+        target = CountdownTarget(
+            key=entry['key'],
+            channel_id=int(entry['channel_id']),
+            guild_id=int(entry['guild_id']) if entry.get('guild_id') else None,
+            release_date=_parse_release_date(entry['release_date'], entry.get('timezone')),
+            steam_app_id=entry['steam_app_id'],
+            title=entry.get('title', "Deltarune"),
+            channel_prefix=entry.get('channel_prefix', entry['key']),
+            store_url=entry.get('store_url'),
+            theme=entry.get('theme'),
+            announce_channel_ids=entry.get('announce_channel_ids', ()),
+            announce_webhooks=entry.get('announce_webhooks', ()),
+        )
+        if target.key in targets:
+            raise ValueError(f"Duplicate countdown target key '{target.key}' in {path}")
+        targets[target.key] = target
+    print(f"Loaded {len(targets)} countdown target(s) from {path}")
+    return targets
@@ -0,0 +1,46 @@
+import asyncio
+
+from attachment_cache import AttachmentCache
+
+
+class CacheChannel:
+    def __init__(self):
+        self.uploads = 0
+
+    async def send(self, file=None):
+        self.uploads += 1
+        attachment = type('Attachment', (), {'url': f"https://cdn.example.invalid/{self.uploads}.png?ex=ffffffff"})()
+        return type('Message', (), {'id': 1000 + self.uploads, 'attachments': [attachment]})()
+
+
+async def make_file():
+    return object()
+
+
+def test_deleted_cache_message_is_uploaded_again():
+    channel = CacheChannel()
+    cache = AttachmentCache(lambda: channel)
+
+    async def main():
+        first = await cache.get_url('key', make_file)
+        assert await cache.get_url('key', make_file) == first
+        assert cache.invalidate_message(1001)
+        assert not cache.invalidate_message(1001)
+        return first, await cache.get_url('key', make_file)
+
+    first, second = asyncio.run(main())
+    assert first != second
+    assert channel.uploads == 2
+
+
+def test_evicted_entries_forget_their_message():
+    channel = CacheChannel()
+    cache = AttachmentCache(lambda: channel, max_entries=1)
+
+    async def main():
+        await cache.get_url('a', make_file)
+        await cache.get_url('b', make_file)
+
+    asyncio.run(main())
+    assert not cache.invalidate_message(1001)
+    assert cache.invalidate_message(1002)
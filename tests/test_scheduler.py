@@ -0,0 +1,62 @@
+import asyncio
+
+from scheduler import TimerHeapScheduler
+
+
+def test_callback_that_raises_is_retried():
+    calls = []
+
+    async def main():
+        scheduler = TimerHeapScheduler(retry_delay=0.01)
+
+        async def flaky():
+            calls.append(len(calls))
+            if len(calls) == 1:
+                raise OSError(104, "Connection reset by peer")
+
+        scheduler.start()
+        scheduler.schedule('rename:deltarune', 0, flaky)
+        for _ in range(100):
+            if len(calls) >= 2:
+                break
+            await asyncio.sleep(0.01)
+        scheduler.stop()
+        return scheduler
+
+    scheduler = asyncio.run(main())
+    assert calls == [0, 1]
+    assert not scheduler.is_scheduled('rename:deltarune')
+
+
+def test_callback_that_raises_after_rescheduling_keeps_its_own_schedule():
+    async def main():
+        scheduler = TimerHeapScheduler(retry_delay=0.01)
+
+        async def reschedules_then_fails():
+            scheduler.schedule('steam:1', 60, reschedules_then_fails)
+            raise asyncio.TimeoutError()
+
+        scheduler.start()
+        scheduler.schedule('steam:1', 0, reschedules_then_fails)
+        await asyncio.sleep(0.05)
+        due = scheduler._pending['steam:1'][0] - scheduler._clock()
+        scheduler.stop()
+        return due
+
+    assert asyncio.run(main()) > 30
+
+
+def test_no_retry_without_retry_delay():
+    async def main():
+        scheduler = TimerHeapScheduler()
+
+        async def fails():
+            raise OSError("boom")
+
+        scheduler.start()
+        scheduler.schedule('rename:deltarune', 0, fails)
+        await asyncio.sleep(0.05)
+        scheduler.stop()
+        return scheduler.is_scheduled('rename:deltarune')
+
+    assert asyncio.run(main()) is False
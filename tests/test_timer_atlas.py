@@ -0,0 +1,37 @@
+import json
+
+import pytest
+
+import countdown
+from themes import THEMES
+
+
+@pytest.fixture
+def extra_themes(tmp_path, monkeypatch):
+    """Adds a light theme and a colored one next to the built-in default."""
+    themes = {
+        'light': {"background": "#ffffff", "elements": [
+            {"type": "text", "slot": "date", "size": 25, "color": "#333333", "space_after": 25},
+            {"type": "timer", "size": 40, "color": "#202020", "released_color": "#000000"}]},
+        'night': {"background": "#101030", "elements": [
+            {"type": "text", "slot": "subtitle", "size": 24, "color": "#8080ff", "space_after": 30},
+            {"type": "timer", "size": 40, "color": "#ffcc00", "released_color": "#00ff00"}]},
+    }
+    for name, spec in themes.items():
+        (tmp_path / f"{name}.json").write_text(json.dumps(spec))
+    monkeypatch.setattr(THEMES, 'directory', str(tmp_path))
+    THEMES.reset()
+    yield sorted(themes)
+    THEMES.reset()
+
+
+def test_atlas_matches_freetype_for_default_theme():
+    assert countdown.verify_timer_atlas(theme_names=['default']) == []
+
+
+def test_atlas_matches_freetype_for_non_black_themes(extra_themes):
+    assert THEMES.names() == ['default'] + extra_themes
+    for name in extra_themes:
+        plan = countdown.load_assets(name)
+        assert countdown.get_timer_atlas(plan, plan.timer.color) is not None
+    assert countdown.verify_timer_atlas() == []
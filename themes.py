@@ -0,0 +1,337 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+
+from PIL import Image, ImageColor, ImageFont
+
+# --- Configuration ---
+THEMES_DIR = os.getenv('COUNTDOWN_THEMES_DIR', 'themes')     # <name>.json files, one theme each
+DEFAULT_THEME_NAME = os.getenv('COUNTDOWN_THEME', 'default')  # Theme for targets that don't pick one
+THEME_CHECK_INTERVAL = 2.0  # Seconds between checks of a theme's files for changes
+
+# Relative font and image paths are resolved against the bot's directory
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Text slots filled in at render time; everything else in a theme is static
+TEXT_SLOTS = ('subtitle', 'date', 'footnote')
+SHOW_STATES = ('always', 'countdown', 'released')
+
+# --- Default Theme ---
+# The original layout: logo, subtitle, date line, timer and footnote stacked
+# top to bottom, each centered within the padding. Elements flow down from
+# the top padding; space_after is the gap below an element, measured from
+# the bottom of its text or image.
+DEFAULT_THEME = {
+    'width': 600,
+    'height': 450,
+    'padding': 25,
+    'background': [0, 0, 0],
+    'font': "assets/pixel-font.ttf",
+    'elements': [
+        {'type': 'image', 'path': "assets/logo.png", 'scale': 0.5, 'space_after': 20},
+        {'type': 'text', 'slot': 'subtitle', 'size': 30, 'color': [255, 255, 255], 'space_after': 45},
+        {'type': 'text', 'slot': 'date', 'size': 25, 'color': [255, 255, 0], 'space_after': 25},
+        {'type': 'timer', 'size': 40, 'color': [173, 173, 173], 'released_color': [255, 255, 255], 'space_after': 25},
+        {'type': 'text', 'slot': 'footnote', 'size': 18, 'color': [204, 204, 204], 'show': 'countdown'},
+    ],
+}
+
+
+class ThemeError(Exception):
+    """Raised when a theme doesn't exist or its spec is invalid."""
+
+
+def _resolve_path(path):
+    return path if os.path.isabs(path) else os.path.join(_SCRIPT_DIR, path)
+
+
+def _color(value, where):
+    try:
+        if isinstance(value, str):
+            return ImageColor.getrgb(value)[:3]
+        return tuple(int(channel) for channel in value)[:3]
+    except Exception:
+        raise ThemeError(f"{where}: invalid color {value!r}")
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return None
+
+
+def _load_image(path, scale):
+    original = Image.open(path)
+    image = original.resize((int(original.width * scale), int(original.height * scale)), Image.Resampling.NEAREST)
+    if image.mode != 'RGBA':
+        # Attempt to convert to RGBA if it's palettized with transparency
+        if image.mode == 'P' and 'transparency' in image.info:
+            image = image.convert('RGBA')
+        elif image.mode != 'RGB':  # Convert other modes like 'L' or 'CMYK' to RGBA for consistency
+            image = image.convert('RGBA')
+    return image
+
+
+class DrawStep:
+    """One element of a compiled theme, with everything that doesn't depend on the render's text resolved."""
+
+    __slots__ = ('kind', 'slot', 'text', 'image', 'font', 'font_path', 'size', 'color', 'released_color',
+                 'space_after', 'show', 'x', 'y', 'height')
+
+    def __init__(self, kind, show='always', space_after=0):
+        self.kind = kind              # 'image', 'text' or 'timer'
+        self.show = show              # Which state the element is drawn in
+        self.space_after = space_after
+        self.slot = None              # Text slot filled in at render time, or None
+        self.text = None              # Fixed text, for text elements without a slot
+        self.image = None
+        self.font = None
+        self.font_path = None
+        self.size = None
+        self.color = None
+        self.released_color = None
+        self.x = None                 # Precomputed left edge, for images and fixed text
+        self.y = None                 # Precomputed top, when nothing above it depends on the text
+        self.height = None            # Precomputed height, for images and fixed text
+
+    def visible(self, game_released):
+        return self.show == 'always' or (self.show == 'released') == game_released
+
+
+class DrawPlan:
+    """
+    A compiled theme: canvas settings, fonts and images loaded, and the
+    elements as DrawSteps in drawing order. Renders only walk the steps.
+
+    Plans are shared between render threads and must not be modified, apart
+    from the atlases and fitted-font caches countdown.py keeps on them.
+    """
+
+    def __init__(self, name, version, width, height, padding, background, steps):
+        self.name = name
+        self.version = version  # Changes whenever the spec or any file it uses changes
+        self.width = width
+        self.height = height
+        self.padding = padding
+        self.background = background
+        self.steps = steps
+        self.timer = next(step for step in steps if step.kind == 'timer')
+        self.atlases = {}  # fill color -> TimerGlyphAtlas or None
+        self.fitted = {}   # (font path, size) -> FreeTypeFont, for text shrunk to fit
+
+
+def _theme_files(spec):
+    """Every font and image file spec uses."""
+    paths = []
+    for element in spec.get('elements', []):
+        if element.get('type') == 'image' and 'path' in element:
+            paths.append(_resolve_path(element['path']))
+        elif element.get('type') in ('text', 'timer'):
+            paths.append(_resolve_path(element.get('font', spec.get('font', ""))))
+    return paths
+
+
+def compile_theme(name, spec, version=""):
+    """
+    Validates spec, loads its fonts and images, and precomputes the position
+    of every element that doesn't depend on the text drawn above it.
+
+    Returns:
+        DrawPlan: The compiled theme.
+    Raises:
+        ThemeError: if the spec is invalid or a font or image can't be loaded.
+    """
+    try:
+        width, height, padding = int(spec['width']), int(spec['height']), int(spec['padding'])
+    except (KeyError, TypeError, ValueError) as e:
+        raise ThemeError(f"Theme '{name}': width, height and padding must be integers ({e})")
+    background = _color(spec.get('background', [0, 0, 0]), f"Theme '{name}' background")
+    available_width = width - 2 * padding
+    if available_width <= 0:
+        print(f"Warning: Padding is too large for image width in theme '{name}'.")
+        available_width = width
+
+    fonts = {}
+    steps = []
+    flow_y = padding  # Top of the next element, while it's still known before rendering
+    for i, element in enumerate(spec.get('elements', [])):
+        where = f"Theme '{name}' element {i}"
+        kind = element.get('type')
+        if kind not in ('image', 'text', 'timer'):
+            raise ThemeError(f"{where}: unknown type {kind!r}")
+        show = element.get('show', 'always')
+        if show not in SHOW_STATES:
+            raise ThemeError(f"{where}: show must be one of {', '.join(SHOW_STATES)}")
+        step = DrawStep(kind, show, int(element.get('space_after', 0)))
+
+        if 'y' in element:
+            flow_y = int(element['y'])
+        step.y = flow_y
+
+        if kind == 'image':
+            path = _resolve_path(element.get('path', ""))
+            if not os.path.exists(path):
+                raise ThemeError(f"{where}: image file not found at '{path}'")
+            try:
+                step.image = _load_image(path, float(element.get('scale', 1)))
+            except Exception as e:
+                raise ThemeError(f"{where}: error opening, resizing, or processing image '{path}': {e}")
+            step.x = (width - step.image.width) // 2
+            step.height = step.image.height
+        else:
+            step.font_path = _resolve_path(element.get('font', spec.get('font', "")))
+            step.size = int(element.get('size', 20))
+            key = (step.font_path, step.size)
+            if key not in fonts:
+                if not os.path.exists(step.font_path):
+                    raise ThemeError(f"{where}: font file not found at '{step.font_path}'")
+                try:
+                    fonts[key] = ImageFont.truetype(step.font_path, step.size)
+                except Exception as e:
+                    raise ThemeError(f"{where}: error loading font '{step.font_path}': {e}")
+            step.font = fonts[key]
+            step.color = _color(element.get('color', [255, 255, 255]), where)
+            if kind == 'timer':
+                step.released_color = _color(element.get('released_color', element.get('color', [255, 255, 255])), where)
+            elif 'slot' in element:
+                if element['slot'] not in TEXT_SLOTS:
+                    raise ThemeError(f"{where}: slot must be one of {', '.join(TEXT_SLOTS)}")
+                step.slot = element['slot']
+            else:
+                step.text = str(element.get('text', ""))
+                left, top, right, bottom = step.font.getbbox(step.text)
+                step.x = max(padding, padding + (available_width - (right - left)) / 2)
+                step.height = bottom - top
+
+        # Whatever comes after text that's only known at render time, or after
+        # an element that isn't always drawn, has to be placed at render time
+        if step.height is not None and show == 'always' and flow_y is not None:
+            flow_y += step.height + step.space_after
+        else:
+            flow_y = None
+        steps.append(step)
+
+    if sum(step.kind == 'timer' for step in steps) != 1:
+        raise ThemeError(f"Theme '{name}' must have exactly one timer element")
+    return DrawPlan(name, version, width, height, padding, background, steps)
+
+
+class ThemeRegistry:
+    """
+    Compiled themes by name, from <name>.json files in a directory plus the
+    built-in default theme (which a default.json overrides).
+
+    A theme is compiled on first use and recompiled, at most once every
+    check_interval seconds, when its JSON file or any font or image it uses
+    changes on disk. If the new version fails to compile, the last good one
+    is kept.
+    """
+
+    def __init__(self, directory=THEMES_DIR, check_interval=THEME_CHECK_INTERVAL, clock=time.monotonic):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}  # name -> {'plan': DrawPlan, 'sources': {path: mtime}, 'checked_at': float}
+        self.reloads = 0
+
+    def _spec_path(self, name):
+        return os.path.join(self.directory, f"{name}.json")
+
+    def names(self):
+        names = {'default'}
+        if os.path.isdir(self.directory):
+            names.update(filename[:-5] for filename in os.listdir(self.directory) if filename.endswith('.json'))
+        return sorted(names)
+
+    def _load_spec(self, name):
+        path = self._spec_path(name)
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    spec = json.load(f)
+            except Exception as e:
+                raise ThemeError(f"Error reading theme file '{path}': {e}")
+            # Canvas settings and elements left out of the file come from the default theme
+            return {**copy.deepcopy(DEFAULT_THEME), **spec}
+        if name == 'default':
+            return copy.deepcopy(DEFAULT_THEME)
+        raise ThemeError(f"Unknown theme '{name}' (no {path})")
+
+    def _compile(self, name):
+        spec = self._load_spec(name)
+        # The spec file is watched even while it doesn't exist, so adding one is picked up too
+        sources = {path: _mtime(path) for path in [self._spec_path(name)] + _theme_files(spec)}
+        digest = hashlib.sha256(json.dumps([spec, sorted(sources.items())], sort_keys=True).encode())
+        plan = compile_theme(name, spec, digest.hexdigest()[:16])
+        return {'plan': plan, 'sources': sources, 'checked_at': self._clock()}
+
+    def get(self, name=None):
+        """
+        Returns the DrawPlan for name (default: COUNTDOWN_THEME).
+
+        Raises:
+            ThemeError: if the theme doesn't exist or has never compiled.
+        """
+        name = name or DEFAULT_THEME_NAME
+        with self._lock:
+            entry = self._entries.get(name)
+            now = self._clock()
+            if entry is not None:
+                if now - entry['checked_at'] < self.check_interval:
+                    return entry['plan']
+                entry['checked_at'] = now
+                if all(_mtime(path) == mtime for path, mtime in entry['sources'].items()):
+                    return entry['plan']
+            try:
+                self._entries[name] = self._compile(name)
+            except ThemeError as e:
+                if entry is None:
+                    raise
+                print(f"Error reloading theme '{name}': {e}. Keeping the previous version.")
+                # Don't retry (and log again) until the files change again
+                entry['sources'] = {path: _mtime(path) for path in entry['sources']}
+                return entry['plan']
+            if entry is not None:
+                self.reloads += 1
+                print(f"Reloaded theme '{name}'.")
+            return self._entries[name]['plan']
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
+
+
+THEMES = ThemeRegistry()
+
+
+def get_plan(name=None):
+    return THEMES.get(name)
+
+
+def theme_version(name=None):
+    """The current version of theme name, for cache keys. None if the theme can't be loaded."""
+    try:
+        return THEMES.get(name).version
+    except ThemeError as e:
+        print(f"Error loading theme: {e}")
+        return None
+
+
+if __name__ == "__main__":
+    # Compile every theme and show where each element lands
+    for theme_name in THEMES.names():
+        try:
+            compiled = THEMES.get(theme_name)
+        except ThemeError as e:
+            print(f"{theme_name}: {e}")
+            continue
+        print(f"{theme_name} ({compiled.version}): {compiled.width}x{compiled.height}, padding {compiled.padding}")
+        for draw_step in compiled.steps:
+            label = draw_step.slot or (repr(draw_step.text) if draw_step.text is not None else draw_step.kind)
+            position = f"y={draw_step.y}" if draw_step.y is not None else "y at render time"
+            print(f"  {draw_step.kind:<6} {label:<12} {position:<18} show={draw_step.show}")